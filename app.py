@@ -1,29 +1,44 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template, session, redirect, url_for
+import time
+STARTUP_STARTED = time.perf_counter()  # Baseline for the startup-time report
+
+from flask import Flask, request, jsonify, send_from_directory, render_template, session, redirect, url_for, Response, g, has_request_context
 from flask_cors import CORS
 import os
+import io
+import wave
+import tempfile
+import subprocess
 import logging
 from datetime import datetime
-import edge_tts
 import asyncio
-from gtts import gTTS
-# from bark_tts.generate_bark import generate_bark_tts  # COMMENTED OUT FOR NOW																			   
+import threading
+import queue
+import atexit
+import concurrent.futures
 from pathlib import Path
-import tempfile
-import torch
-from werkzeug.utils import secure_filename
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+from werkzeug.utils import secure_filename, safe_join
 import secrets
-from functools import wraps
-import stripe
+from functools import wraps, lru_cache
+from contextlib import contextmanager
 import uuid
+import sys
+import importlib
+import importlib.util
 import json
-import psutil
+import hashlib
+import gzip
+import bisect
+import inspect
+import unicodedata
+from collections import OrderedDict, deque
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_session import Session
 import hmac
 import re
-from authlib.integrations.flask_client import OAuth
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
 
@@ -35,6 +50,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Startup timing: each mark records the time spent since the previous one
+STARTUP_PHASES = []
+
+def mark_startup_phase(name):
+    now = time.perf_counter()
+    previous = STARTUP_PHASES[-1][2] if STARTUP_PHASES else STARTUP_STARTED
+    STARTUP_PHASES.append((name, now - previous, now))
+
+# Heavy dependencies imported on first use rather than at startup
+LAZY_DEPENDENCIES = ('edge_tts', 'gtts', 'boto3', 'stripe', 'psutil', 'authlib.integrations.flask_client')
+
+def startup_report(import_lazy=False):
+    """Startup phase breakdown; optionally also time importing each lazy dependency"""
+    report = {
+        'total_ms': round(((STARTUP_PHASES[-1][2] if STARTUP_PHASES else time.perf_counter()) - STARTUP_STARTED) * 1000, 1),
+        'phases': [{'name': name, 'ms': round(duration * 1000, 1)} for name, duration, _ in STARTUP_PHASES]
+    }
+    if import_lazy:
+        report['lazy_imports'] = []
+        for module in LAZY_DEPENDENCIES:
+            entry = {'module': module, 'ms': 0.0, 'loaded': module in sys.modules}
+            if not entry['loaded']:
+                started = time.perf_counter()
+                try:
+                    importlib.import_module(module)
+                    entry['loaded'] = True
+                except ImportError as e:
+                    entry['error'] = str(e)
+                entry['ms'] = round((time.perf_counter() - started) * 1000, 1)
+            report['lazy_imports'].append(entry)
+    return report
+
+mark_startup_phase('imports')
+
 # Load environment variables
 load_dotenv()
 
@@ -59,6 +108,68 @@ class Config:
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
     GITHUB_CLIENT_ID = os.getenv('GITHUB_CLIENT_ID')
     GITHUB_CLIENT_SECRET = os.getenv('GITHUB_CLIENT_SECRET')
+    EDGE_LOOP_WORKERS = int(os.getenv('EDGE_LOOP_WORKERS', 1))  # Background event loops for Edge-TTS
+    EDGE_TTS_TIMEOUT = float(os.getenv('EDGE_TTS_TIMEOUT', 60))  # Seconds to wait for one synthesis
+    SYNTHESIS_CACHE_SIZE = int(os.getenv('SYNTHESIS_CACHE_SIZE', 1024))  # Max cached synthesis results
+    SYNTHESIS_FLIGHT_MAX_KEYS = int(os.getenv('SYNTHESIS_FLIGHT_MAX_KEYS', 1024))  # Distinct in-flight syntheses coalesced
+    SEGMENT_MAX_CHARS = int(os.getenv('SEGMENT_MAX_CHARS', 1500))  # Polly rejects >3000 billed chars
+    SEGMENT_PARALLELISM = int(os.getenv('SEGMENT_PARALLELISM', 4))  # Concurrent segments per request
+    SEGMENT_MAX_RETRIES = int(os.getenv('SEGMENT_MAX_RETRIES', 2))  # Retries per failed segment
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # Background threads processing TTS jobs
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 100))  # Max queued jobs before rejecting new ones
+    JOB_CHAR_LIMIT = int(os.getenv('JOB_CHAR_LIMIT', 100000))
+    JOB_JOURNAL_PATH = os.getenv('JOB_JOURNAL_PATH')  # Default: <instance>/jobs/job_journal.jsonl
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', 86400))  # Seconds finished jobs stay queryable
+    JOB_MAINTENANCE_INTERVAL = int(os.getenv('JOB_MAINTENANCE_INTERVAL', 300))  # Prune, adopt orphans, compact
+    VOICES_CACHE_MAX_AGE = int(os.getenv('VOICES_CACHE_MAX_AGE', 300))  # Browser cache for /api/voices
+    AUDIO_MAX_AGE = int(os.getenv('AUDIO_MAX_AGE', 31536000))  # Content-named audio never changes
+    PREVIEW_MAX_AGE = int(os.getenv('PREVIEW_MAX_AGE', 86400))  # Previews revalidate via ETag afterwards
+    TTS_DEADLINE = float(os.getenv('TTS_DEADLINE', 45))  # Seconds a /api/generate_tts request may spend on engines
+    TTS_PRIMARY_BUDGET_SHARE = float(os.getenv('TTS_PRIMARY_BUDGET_SHARE', 0.6))  # Rest is kept for fallbacks
+    POLLY_CONNECT_TIMEOUT = float(os.getenv('POLLY_CONNECT_TIMEOUT', 5))
+    POLLY_READ_TIMEOUT = float(os.getenv('POLLY_READ_TIMEOUT', 30))
+    POLLY_WORKERS = int(os.getenv('POLLY_WORKERS', 8))  # Threads running deadline-bound Polly calls
+    BREAKER_WINDOW = float(os.getenv('BREAKER_WINDOW', 60))  # Seconds of engine outcomes considered
+    BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))  # Calls in the window before it can open
+    BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', 0.5))  # Failure ratio that opens the breaker
+    BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 30))  # Seconds open before a trial call
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'true').lower() == 'true'  # Allow requests to opt in with "hedge": true
+    HEDGE_MAX_CHARS = int(os.getenv('HEDGE_MAX_CHARS', 400))  # Only short prompts are worth a second request
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 0.9))  # Primary latency percentile that triggers the hedge
+    HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', 1.5))  # Until HEDGE_MIN_SAMPLES latencies are known
+    HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 0.25))
+    HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', 20))
+    HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', 16))
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() == 'true'  # Per-stage Server-Timing header
+    SERVER_TIMING_DEBUG = os.getenv('SERVER_TIMING_DEBUG', 'false').lower() == 'true'  # Also add 'timings' to JSON
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'  # Prometheus text on /metrics
+    FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')  # Used to transcode to the requested output format
+    TRANSCODE_TIMEOUT = float(os.getenv('TRANSCODE_TIMEOUT', 60))
+    AUDIO_RETENTION = int(os.getenv('AUDIO_RETENTION', 7 * 86400))  # Delete audio not served for this long (0 = keep)
+    AUDIO_MAX_BYTES = int(os.getenv('AUDIO_MAX_BYTES', 2 * 2**30))  # Quota for static/audio (0 = unlimited)
+    AUDIO_GC_INTERVAL = int(os.getenv('AUDIO_GC_INTERVAL', 300))  # Seconds between sweeps
+    AUDIO_GC_RESCAN_INTERVAL = int(os.getenv('AUDIO_GC_RESCAN_INTERVAL', 3600))  # Pick up files other workers wrote
+    AUDIO_TOUCH_INTERVAL = int(os.getenv('AUDIO_TOUCH_INTERVAL', 3600))  # Min seconds between mtime bumps of a served file
+    AUDIO_OFFLOAD = os.getenv('AUDIO_OFFLOAD', '').lower()  # '', 'x-sendfile' or 'x-accel'
+    AUDIO_ACCEL_PREFIX = os.getenv('AUDIO_ACCEL_PREFIX', '/_protected')  # nginx internal location
+    USE_X_SENDFILE = AUDIO_OFFLOAD == 'x-sendfile'
+    PREWARM_PREVIEWS = os.getenv('PREWARM_PREVIEWS', 'false').lower() == 'true'  # Render previews at startup
+    PREWARM_CONCURRENCY = int(os.getenv('PREWARM_CONCURRENCY', 4))
+    COQUI_ENABLED = os.getenv('COQUI_ENABLED', 'true').lower() == 'true'  # Local fallback engine (needs TTS package)
+    COQUI_MAX_MEMORY_MB = int(os.getenv('COQUI_MAX_MEMORY_MB', 1024))  # Budget for loaded Coqui models
+    COQUI_FEMALE_SPEAKER = os.getenv('COQUI_FEMALE_SPEAKER', 'p225')  # Multi-speaker (VCTK) defaults
+    COQUI_MALE_SPEAKER = os.getenv('COQUI_MALE_SPEAKER', 'p226')
+    COQUI_ALLOW_DOWNLOAD = os.getenv('COQUI_ALLOW_DOWNLOAD', 'false').lower() == 'true'  # Else fetch at deploy: app.py --download-coqui-models
+    COQUI_RETRY_FAILED_AFTER = float(os.getenv('COQUI_RETRY_FAILED_AFTER', 3600))  # Seconds before a failed model load is retried
+    BARK_ENABLED = os.getenv('BARK_ENABLED', 'false').lower() == 'true'
+    BARK_REQUEST_WAIT = float(os.getenv('BARK_REQUEST_WAIT', 0))  # Seconds a request may wait for model load
+    BARK_SERVER_ADDRESS = os.getenv('BARK_SERVER_ADDRESS', '')  # Use the bark_server process instead of in-process models
+    BARK_SERVER_TIMEOUT = float(os.getenv('BARK_SERVER_TIMEOUT', 300))  # Base wait: queueing and model load
+    BARK_SEGMENT_TIMEOUT = float(os.getenv('BARK_SEGMENT_TIMEOUT', 60))  # Added per long-form segment
+    BARK_CHAR_LIMIT = int(os.getenv('BARK_CHAR_LIMIT', FREE_CHAR_LIMIT))  # Same cap as /api/generate_tts
+    BARK_SYNC_SEGMENTS = int(os.getenv('BARK_SYNC_SEGMENTS', 2))  # Longer Bark requests run as a job (202)
+    BARK_PRELOAD = os.getenv('BARK_PRELOAD', 'false').lower() == 'true'  # Load before gunicorn forks (see gunicorn.conf.py)
+    BARK_WORKER_PRIVATE_MB = int(os.getenv('BARK_WORKER_PRIVATE_MB', 1024))  # Unshared memory budget per worker
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -81,7 +192,9 @@ CORS(app, supports_credentials=True, resources={
         "expose_headers": [
             "Content-Type",
             "X-CSRFToken",
-            "Content-Disposition"  # Useful for file downloads
+            "Content-Disposition",  # Useful for file downloads
+            "X-Audio-Url",  # Store location of streamed audio
+            "X-TTS-Service"
         ],
         "supports_credentials": True,
         "max_age": 86400  # 24-hour preflight cache
@@ -90,30 +203,43 @@ CORS(app, supports_credentials=True, resources={
 
 # After app creation, add:
 csrf = CSRFProtect(app)
-oauth = OAuth(app)
-
-# Configure OAuth providers
-google = oauth.register(
-    name='google',
-    client_id=os.getenv('GOOGLE_CLIENT_ID'),  # Get from environment variables
-    client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
 
-github = oauth.register(
-    name='github',
-    client_id=os.getenv('GITHUB_CLIENT_ID'),
-    client_secret=os.getenv('GITHUB_CLIENT_SECRET'),
-    access_token_url='https://github.com/login/oauth/access_token',
-    authorize_url='https://github.com/login/oauth/authorize',
-    api_base_url='https://api.github.com/',
-    client_kwargs={
-        'scope': 'user:email'
+# OAuth providers, registered with authlib on first login attempt
+OAUTH_PROVIDERS = {
+    'google': {
+        'client_id': os.getenv('GOOGLE_CLIENT_ID'),  # Get from environment variables
+        'client_secret': os.getenv('GOOGLE_CLIENT_SECRET'),
+        'server_metadata_url': 'https://accounts.google.com/.well-known/openid-configuration',
+        'client_kwargs': {
+            'scope': 'openid email profile'
+        }
+    },
+    'github': {
+        'client_id': os.getenv('GITHUB_CLIENT_ID'),
+        'client_secret': os.getenv('GITHUB_CLIENT_SECRET'),
+        'access_token_url': 'https://github.com/login/oauth/access_token',
+        'authorize_url': 'https://github.com/login/oauth/authorize',
+        'api_base_url': 'https://api.github.com/',
+        'client_kwargs': {
+            'scope': 'user:email'
+        }
     }
-)
+}
+
+_oauth = None
+_oauth_lock = threading.Lock()
+
+def get_oauth_client(name):
+    """Import authlib and register the OAuth providers on first use"""
+    global _oauth
+    with _oauth_lock:
+        if _oauth is None:
+            from authlib.integrations.flask_client import OAuth
+            oauth = OAuth(app)
+            for provider, settings in OAUTH_PROVIDERS.items():
+                oauth.register(name=provider, **settings)
+            _oauth = oauth
+    return _oauth.create_client(name)
 
 # Required configuration for Flask-Session
 app.config['SESSION_TYPE'] = 'filesystem'
@@ -123,6 +249,8 @@ app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour session lifetime
 # Initialize Flask-Session
 Session(app)
 
+mark_startup_phase('app_setup')
+
 # Required helper functions
 def validate_email(email):
     """Basic email validation"""
@@ -132,16 +260,48 @@ def secure_compare(a, b):
     """Timing-attack safe string comparison"""
     return hmac.compare_digest(a.encode(), b.encode())
 
-# Initialize Stripe
-stripe.api_key = app.config['STRIPE_SECRET_KEY']
+# Stripe is imported on first payment request
+def get_stripe():
+    import stripe
+    stripe.api_key = app.config['STRIPE_SECRET_KEY']
+    return stripe
 
-# Initialize AWS Polly client
-try:
-    polly_client = boto3.client('polly')
-    logger.info("Amazon Polly client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Amazon Polly client: {str(e)}")
-    polly_client = None
+# AWS Polly client, created on first use (False marks a failed initialization)
+_polly_client = None
+_polly_client_lock = threading.Lock()
+
+def get_polly_client():
+    global _polly_client
+    with _polly_client_lock:
+        if _polly_client is None:
+            try:
+                import boto3
+                from botocore.config import Config as BotoConfig
+                _polly_client = boto3.client('polly', config=BotoConfig(
+                    connect_timeout=app.config['POLLY_CONNECT_TIMEOUT'],
+                    read_timeout=app.config['POLLY_READ_TIMEOUT'],
+                    retries={'max_attempts': 2}
+                ))
+                logger.info("Amazon Polly client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Amazon Polly client: {str(e)}")
+                _polly_client = False
+    return _polly_client or None
+
+_polly_pool = None
+_polly_pool_pid = None
+
+def get_polly_pool():
+    """Executor that lets a caller stop waiting on Polly when its budget runs out, recreated after a fork"""
+    global _polly_pool, _polly_pool_pid
+    with _polly_client_lock:
+        if _polly_pool is None or _polly_pool_pid != os.getpid():
+            _polly_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, app.config['POLLY_WORKERS']),
+                thread_name_prefix='polly'
+            )
+            _polly_pool_pid = os.getpid()
+        return _polly_pool
 
 # Database simulation (in production, use a real database)
 users_db = {}
@@ -173,7 +333,6 @@ VOICES = {
             "name": "Surja (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits",
             "style": "authoritative",
             "use_cases": ["news", "presentations"],
             "description": "Deep commanding voice for professional narration",
@@ -211,7 +370,6 @@ VOICES = {
             "name": "Riya (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits--female",
             "style": "cheerful",
             "use_cases": ["storytelling", "customer_service"],
             "description": "Warm and friendly voice ideal for conversational apps",
@@ -224,7 +382,6 @@ VOICES = {
             "name": "Aarav (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits",
             "style": "authoritative",
             "use_cases": ["news", "presentations"],
             "description": "Deep commanding voice for professional narration",
@@ -276,7 +433,6 @@ VOICES = {
             "name": "Anchal (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits--female",
             "style": "cheerful",
             "use_cases": ["storytelling", "customer_service"],
             "description": "Warm and friendly voice ideal for children's content",
@@ -289,7 +445,6 @@ VOICES = {
             "name": "Kavya (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits--female",
             "style": "calm",
             "use_cases": ["meditation", "audiobooks"],
             "description": "Soothing voice perfect for relaxation content",
@@ -342,7 +497,6 @@ VOICES = {
             "name": "Niku (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits--female",
             "style": "cheerful",
             "use_cases": ["storytelling", "customer_service"],
             "description": "Warm and friendly voice ideal for conversational apps",
@@ -608,7 +762,6 @@ VOICES = {
             "name": "Khalid (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "ar-css10-vits",
             "style": "authoritative",
             "use_cases": ["news", "religious"],
             "description": "Strong traditional Arabic voice",
@@ -621,7 +774,6 @@ VOICES = {
             "name": "Layla (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "ar-css10-vits",
             "style": "gentle",
             "use_cases": ["education", "children"],
             "description": "Soft-spoken Arabic voice for nurturing content",
@@ -636,7 +788,7 @@ VOICES = {
             "name": "Max (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "de-css10-vits",
+            "coqui_fallback": "de-thorsten-vits",
             "style": "precise",
             "use_cases": ["technology", "education"],
             "description": "Clear and precise German voice",
@@ -649,7 +801,7 @@ VOICES = {
             "name": "Anna (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "de-css10-vits",
+            "coqui_fallback": "de-thorsten-vits",
             "style": "friendly",
             "use_cases": ["customer_service", "tourism"],
             "description": "Approachable German voice for everyday use",
@@ -664,7 +816,7 @@ VOICES = {
             "name": "Haruto (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "ja-css10-vits",
+            "coqui_fallback": "ja-kokoro-tacotron2-DDC",
             "style": "formal",
             "use_cases": ["business", "education"],
             "description": "Polite Japanese voice for professional settings",
@@ -677,7 +829,7 @@ VOICES = {
             "name": "Sakura (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "ja-css10-vits",
+            "coqui_fallback": "ja-kokoro-tacotron2-DDC",
             "style": "gentle",
             "use_cases": ["entertainment", "children"],
             "description": "Soft Japanese voice with friendly tone",
@@ -690,7 +842,6 @@ VOICES = {
             "name": "Aarav (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits",
             "style": "authoritative",
             "use_cases": ["news", "presentations"],
             "description": "Deep commanding voice for professional narration",
@@ -703,7 +854,6 @@ VOICES = {
             "name": "Ananya (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "hi-cv-vits--female",
             "style": "cheerful",
             "use_cases": ["storytelling", "customer_service"],
             "description": "Warm and friendly voice ideal for children's content",
@@ -718,7 +868,7 @@ VOICES = {
             "name": "Tanishaa (Female)",
             "gender": "female",
             "service": "edge",
-            "coqui_fallback": "bn-cv-vits",
+            "coqui_fallback": "bn-custom-vits-female",
             "style": "gentle",
             "use_cases": ["audiobooks", "ASMR"],
             "description": "Soft-spoken voice with lyrical quality",
@@ -731,7 +881,7 @@ VOICES = {
             "name": "Bashkar (Male)",
             "gender": "male",
             "service": "edge",
-            "coqui_fallback": "bn-cv-vits",
+            "coqui_fallback": "bn-custom-vits-male",
             "style": "serious",
             "use_cases": ["documentaries", "news"],
             "description": "Authoritative delivery for factual content",
@@ -791,19 +941,90 @@ GTTS_LANG_CODES = {
     "kannada": "kn"
 }
 
+# Voice catalog indexes, compiled once so handlers never scan VOICES
+class VoiceIndex:
+    """Lookup tables over the voice catalog: by id, (language, id) and service"""
+    def __init__(self, voices):
+        self.by_id = {}           # voice_id -> (language, voice), first listing wins
+        self.by_language_id = {}  # (language, voice_id) -> voice
+        self.by_service = {}      # service -> [(language, voice)]
+        self.voice_counts = {}
+        self.services = set()
+
+        for language, language_voices in voices.items():
+            self.voice_counts[language] = len(language_voices)
+            for voice in language_voices:
+                service = voice.get('service', 'edge')
+                self.services.add(service)
+                voice_id = voice.get('id')
+                if not voice_id:
+                    continue  # Catalog placeholders (e.g. untrained Coqui voices)
+                entry = (language, voice)
+                self.by_id.setdefault(voice_id, entry)
+                self.by_language_id.setdefault((language, voice_id), voice)
+                self.by_service.setdefault(service, []).append(entry)
+
+    def find(self, language, voice_id):
+        return self.by_language_id.get((language, voice_id))
+
+    def find_by_id(self, voice_id):
+        """Return (language, voice) for the first catalog entry with this id, or (None, None)"""
+        return self.by_id.get(voice_id, (None, None))
+
+    def equivalent(self, language, voice, services=('edge', 'polly')):
+        """Closest voice in the same language on another engine: same gender first, then any"""
+        own_service = voice.get('service', 'edge')
+        candidates = [
+            candidate
+            for service in services if service != own_service
+            for candidate_language, candidate in self.by_service.get(service, [])
+            if candidate_language == language
+        ]
+        gender = voice.get('gender', 'unknown').lower()
+        for candidate in candidates:
+            if candidate.get('gender', 'unknown').lower() == gender:
+                return candidate
+        return candidates[0] if candidates else None
+
+VOICE_INDEX = VoiceIndex(VOICES)
+
 # Helper functions
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_audio_file(audio_data, voice_id, extension="wav"):
+def write_file_atomic(path, data):
+    """Write to a temp file in the target directory, then rename it into place"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
     try:
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"tts_{voice_id}_{timestamp}.{extension}"
-        filepath = os.path.join(AUDIO_FOLDER, filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(audio_data)
-        
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def sharded_audio_name(key, extension):
+    """'<key>.<ext>' under two levels of subdirectories taken from the key, e.g. 'ab/cd/abcd....mp3'"""
+    return f"{key[:2]}/{key[2:4]}/{key}.{extension}"
+
+def audio_output_path(filename):
+    """Filesystem path for a sharded audio name, creating its shard directories"""
+    filepath = os.path.join(AUDIO_FOLDER, *filename.split('/'))
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    return filepath
+
+def save_audio_file(audio_data, extension="wav"):
+    """Store audio under a name derived from its content; identical audio maps to the same file"""
+    try:
+        filename = sharded_audio_name(hashlib.sha256(audio_data).hexdigest()[:32], extension)
+        filepath = audio_output_path(filename)
+
+        # Same name means same bytes, so an existing file never needs rewriting
+        if not os.path.exists(filepath):
+            write_file_atomic(filepath, audio_data)
+        get_audio_janitor().record(filename, len(audio_data))
+
         return {
             "status": "success",
             "audio_url": f"/static/audio/{filename}",
@@ -813,98 +1034,1201 @@ def save_audio_file(audio_data, voice_id, extension="wav"):
         logger.error(f"Error saving audio file: {str(e)}")
         return {"status": "error", "message": str(e)}
 
-async def async_generate_with_edge(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+# In-process metrics, rendered in the Prometheus text format on /metrics
+def format_metric_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+class Counter:
+    """Monotonic count per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{format_metric_labels(self.labels, k)} {v}" for k, v in values]
+
+class Histogram:
+    """Bucketed observations per label combination; buckets are upper bounds in seconds"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        lines = []
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f"{self.name}_bucket{format_metric_labels(self.labels + ('le',), label_values + (le,))} {cumulative}")
+            labels = format_metric_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class GaugeFunction:
+    """Value read at scrape time from fn(), which returns a number or {label values tuple: number}"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, fn, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.fn = fn
+
+    def render(self):
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{format_metric_labels(self.labels, k)} {v}" for k, v in values.items()]
+
+class CounterFunction(GaugeFunction):
+    """Running total read at scrape time from a component's own counters; name it *_total"""
+    kind = 'counter'
+
+class MetricsRegistry:
+    """Per-process metrics; with several workers each one reports its own series"""
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                logger.error(f"Metric {metric.name} error: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+HTTP_REQUEST_SECONDS = metrics.register(Histogram(
+    'tts_http_request_duration_seconds', 'Time to response headers per route',
+    ('route', 'method', 'status'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+))
+ENGINE_SECONDS = metrics.register(Histogram(
+    'tts_engine_duration_seconds', 'Latency of one engine call per voice',
+    ('engine', 'voice', 'outcome'),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+))
+ENGINE_CHARACTERS = metrics.register(Counter(
+    'tts_engine_characters_total', 'Characters synthesized successfully', ('engine',)
+))
+ENGINE_FAILURES = metrics.register(Counter(
+    'tts_engine_failures_total', 'Engine calls that returned no audio', ('engine',)
+))
+TTS_FALLBACKS = metrics.register(Counter(
+    'tts_fallbacks_total', 'Requests served by a fallback engine', ('service', 'fallback')
+))
+TTS_FAILURES = metrics.register(Counter(
+    'tts_requests_failed_total', 'Requests where every engine failed', ('service',)
+))
+
+def budget_ran_out(kwargs, started, result):
+    """True when an engine call gave no audio because the caller's timeout expired, not the engine"""
+    timeout = kwargs.get('timeout')
+    return not result and timeout is not None and time.monotonic() - started >= timeout
+
+def instrument_engine(engine, voice_arg):
+    """Record latency, outcome and characters for an engine function returning audio bytes or None"""
+    def decorator(f):
+        signature = inspect.signature(f)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            voice = bound.arguments.get(voice_arg, '')
+            started = time.monotonic()
+            result = None
+            try:
+                result = f(*args, **kwargs)
+                return result
+            finally:
+                if result:
+                    outcome = 'success'
+                    ENGINE_CHARACTERS.inc(engine, amount=len(bound.arguments.get('text', '')))
+                elif budget_ran_out(kwargs, started, result):
+                    outcome = 'deadline'
+                else:
+                    outcome = 'failure'
+                    ENGINE_FAILURES.inc(engine)
+                ENGINE_SECONDS.observe(time.monotonic() - started, engine, voice, outcome)
+        return wrapper
+    return decorator
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+
+# Circuit breakers: stop calling an engine that keeps failing
+class CircuitBreaker:
+    """Opens when an engine's failure ratio over a rolling window crosses a threshold.
+
+    While open every call is skipped; after the cooldown a single trial call is let
+    through (half-open) and its outcome closes the breaker or opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, window, min_calls, error_rate, cooldown):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._failures = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        logger.warning(f"Circuit breaker for {self.name} opened")
+
+    def is_open(self):
+        """True while calls would be rejected, without claiming the half-open trial"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.cooldown
+            return self.state == self.HALF_OPEN and self._trial_in_flight
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok):
+        """ok=None records no verdict (e.g. the caller's budget ran out) but frees a half-open trial"""
+        now = time.monotonic()
+        with self._lock:
+            if ok is None:
+                if self.state == self.HALF_OPEN:
+                    self._trial_in_flight = False
+                return
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    self._failures = 0
+                    logger.info(f"Circuit breaker for {self.name} closed")
+                else:
+                    self._open(now)
+                return
+            if self.state == self.OPEN:
+                return  # Late result from a call made before the breaker opened
+
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._prune(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.error_rate:
+                self._open(now)
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'window_calls': calls,
+                'window_failures': self._failures,
+                'error_rate': round(self._failures / calls, 4) if calls else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+def new_breaker(name):
+    return CircuitBreaker(
+        name,
+        app.config['BREAKER_WINDOW'],
+        app.config['BREAKER_MIN_CALLS'],
+        app.config['BREAKER_ERROR_RATE'],
+        app.config['BREAKER_COOLDOWN']
+    )
+
+engine_breakers = {engine: new_breaker(engine) for engine in ('edge', 'polly', 'gtts')}
+engine_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    """Breaker by name, created on first use (per-model breakers such as 'coqui:<model>')"""
+    with engine_breakers_lock:
+        breaker = engine_breakers.get(name)
+        if breaker is None:
+            breaker = engine_breakers[name] = new_breaker(name)
+        return breaker
+
+def with_circuit_breaker(engine, key_arg=None, key=str):
+    """Skip the engine function (returning None) while its breaker is open; feed it the outcome
+    of every call except those cut short by the caller's own timeout.
+
+    With key_arg, each key(argument value) gets its own breaker, so one broken model does not
+    take the engine's other models down with it."""
+    def decorator(f):
+        signature = inspect.signature(f)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if key_arg:
+                breaker = get_breaker(f"{engine}:{key(signature.bind(*args, **kwargs).arguments[key_arg])}")
+            else:
+                breaker = get_breaker(engine)
+            if not breaker.allow():
+                return None
+            started = time.monotonic()
+            result = None
+            try:
+                result = f(*args, **kwargs)
+                return result
+            finally:
+                breaker.record(None if budget_ran_out(kwargs, started, result) else bool(result))
+        return wrapper
+    return decorator
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before any engine produced audio"""
+
+def budget_left(deadline):
+    """Seconds until a time.monotonic() deadline, or None when there is no deadline"""
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+# Server-Timing: named stages of the current request
+@contextmanager
+def timing_span(name):
+    """Time a stage of the current request; a no-op outside a request (job workers, prewarm)"""
+    started = time.perf_counter()
     try:
-        speed = max(0.5, min(2.0, float(speed)))
-        pitch = max(0.9, min(1.1, float(pitch)))
-        
-        rate = None
-        if speed != 1.0 or pitch != 1.0:
-            rate = f"{int((speed - 1) * 100)}%"
-            if speed > 1.0:
-                rate = f"+{rate}"
-            pitch_adjust = int((pitch - 1) * 5)
-            if pitch_adjust != 0:
-                rate += f"{pitch_adjust:+}%"
-
-        content = f"<speak>{text}</speak>" if ssml else text
-
-        communicate = edge_tts.Communicate(
-            text=content,
-            voice=voice_id,
-            rate=rate if rate else "+0%"
+        yield
+    finally:
+        if has_request_context():
+            g.setdefault('timing_spans', []).append((name, (time.perf_counter() - started) * 1000))
+
+def timing_report():
+    """Milliseconds per stage (repeated stages summed) plus the request total so far"""
+    report = {}
+    for name, duration in g.get('timing_spans', []):
+        report[name] = report.get(name, 0.0) + duration
+    started = g.get('request_started')
+    if started is not None:
+        report['total'] = (time.perf_counter() - started) * 1000
+    return {name: round(duration, 2) for name, duration in report.items()}
+
+@app.after_request
+def add_server_timing(response):
+    if app.config['SERVER_TIMING'] and g.get('timing_spans'):
+        response.headers['Server-Timing'] = ', '.join(
+            f"{name};dur={duration}" for name, duration in timing_report().items()
+        )
+    return response
+
+# Garbage collection for static/audio
+class AudioJanitor:
+    """Evicts generated audio by age and total size, least recently served first.
+
+    Sizes and access times live in an in-memory index fed by record()/touch(), so a sweep
+    never walks the tree. Only the process holding the sweep lock deletes files; it rescans
+    the tree every AUDIO_GC_RESCAN_INTERVAL to learn about files other workers wrote. Access
+    times are shared through the files' mtime: touch() bumps it at most once per
+    touch_interval, and the sweeper takes the newer of its own record and the mtime.
+    """
+    def __init__(self, root, retention, max_bytes, interval, rescan_interval, touch_interval=3600):
+        self.root = root
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        self.touch_interval = touch_interval
+        self.pid = os.getpid()
+        self.total_bytes = 0
+        self._index = OrderedDict()  # filename -> [size, last_access], least recently served first
+        self._lock = threading.Lock()
+        self._sweep_lock = None
+        self._last_scan = 0
+        self._stats = {'sweeps': 0, 'expired': 0, 'evicted': 0, 'freed_bytes': 0, 'last_sweep': None}
+        if retention or max_bytes:
+            threading.Thread(target=self._run, name='audio-janitor', daemon=True).start()
+
+    def record(self, filename, size):
+        with self._lock:
+            entry = self._index.pop(filename, None)
+            if entry:
+                self.total_bytes -= entry[0]
+            self._index[filename] = [size, time.time()]
+            self.total_bytes += size
+
+    def _path(self, filename):
+        return os.path.join(self.root, *filename.split('/'))
+
+    def _mtime(self, filename):
+        try:
+            return os.stat(self._path(filename)).st_mtime
+        except OSError:
+            return None
+
+    def touch(self, filename):
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(filename)
+            if entry:
+                entry[1] = now
+                self._index.move_to_end(filename)
+        # The sweeper may be another process, so publish the access through the mtime
+        mtime = self._mtime(filename)
+        if mtime is not None and now - mtime >= self.touch_interval:
+            try:
+                os.utime(self._path(filename))
+            except OSError as e:
+                logger.error(f"Audio touch error for {filename}: {str(e)}")
+
+    def _acquire_sweep_lock(self):
+        if not fcntl:
+            return True
+        if self._sweep_lock is None:
+            lock_file = open(os.path.join(self.root, '.janitor.lock'), 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False  # Another process sweeps
+            self._sweep_lock = lock_file  # Held for the life of the process
+        return True
+
+    def _scan(self):
+        """Rebuild the index from disk; a file's last access is the newer of its mtime and the
+        access time already known in memory"""
+        scan_started = time.time()
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith('.') or name.endswith(('.part', '.tmp')):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((os.path.relpath(path, self.root).replace(os.sep, '/'), stat.st_size, stat.st_mtime))
+
+        with self._lock:
+            known = self._index
+            merged = [(max(known[f][1], mtime) if f in known else mtime, f, size) for f, size, mtime in found]
+            on_disk = {f for f, _, _ in found}
+            # Keep files recorded while the walk was running
+            merged += [(accessed, f, size) for f, (size, accessed) in known.items()
+                       if f not in on_disk and accessed >= scan_started]
+            merged.sort()
+            self._index = OrderedDict((f, [size, accessed]) for accessed, f, size in merged)
+            self.total_bytes = sum(size for _, _, size in merged)
+        self._last_scan = time.time()
+
+    def _remove(self, filename, size, reason):
+        try:
+            os.remove(self._path(filename))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Audio cleanup error for {filename}: {str(e)}")
+            return
+        self._stats[reason] += 1
+        self._stats['freed_bytes'] += size
+
+    def sweep(self):
+        if time.time() - self._last_scan >= self.rescan_interval:
+            self._scan()
+
+        victims = []
+        with self._lock:
+            cutoff = time.time() - self.retention if self.retention else None
+            while self._index:
+                filename, entry = next(iter(self._index.items()))
+                size, accessed = entry
+                if cutoff is not None and accessed < cutoff:
+                    reason = 'expired'
+                elif self.max_bytes and self.total_bytes > self.max_bytes:
+                    reason = 'evicted'
+                else:
+                    break
+                mtime = self._mtime(filename)
+                if mtime is not None and mtime > accessed:
+                    # Served by another worker since the last scan
+                    entry[1] = mtime
+                    self._index.move_to_end(filename)
+                    continue
+                del self._index[filename]
+                self.total_bytes -= size
+                victims.append((filename, size, reason))
+
+        for filename, size, reason in victims:
+            self._remove(filename, size, reason)
+        self._stats['sweeps'] += 1
+        self._stats['last_sweep'] = datetime.utcnow().isoformat()
+        if victims:
+            logger.info(f"Audio cleanup removed {len(victims)} files")
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_sweep_lock():
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"Audio cleanup error: {str(e)}")
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            files = len(self._index)
+            total_bytes = self.total_bytes
+        return dict(
+            self._stats,
+            files=files,
+            total_bytes=total_bytes,
+            max_bytes=self.max_bytes,
+            retention=self.retention,
+            sweeper=self._sweep_lock is not None or not fcntl
         )
 
-        temp_file = os.path.join(
-            tempfile.gettempdir(),
-            f"edge_{datetime.now().strftime('%Y%m%d%H%M%S')}.mp3"
+_audio_janitor = None
+_audio_janitor_lock = threading.Lock()
+
+def get_audio_janitor():
+    """Return the process-wide audio janitor, starting its sweeper lazily after a fork"""
+    global _audio_janitor
+    with _audio_janitor_lock:
+        if _audio_janitor is None or _audio_janitor.pid != os.getpid():
+            _audio_janitor = AudioJanitor(
+                AUDIO_FOLDER,
+                app.config['AUDIO_RETENTION'],
+                app.config['AUDIO_MAX_BYTES'],
+                app.config['AUDIO_GC_INTERVAL'],
+                app.config['AUDIO_GC_RESCAN_INTERVAL'],
+                app.config['AUDIO_TOUCH_INTERVAL']
+            )
+        return _audio_janitor
+
+# Single-flight: concurrent callers for the same key share one execution
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers wait and share its result or error.
+
+    With max_keys, a call for a new key while that many keys are in flight runs on its own
+    instead of being tracked, so the table stays bounded.
+    """
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.bypassed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.peak_in_flight = 0
+
+    def do(self, key, fn, timeout=None, retry=None):
+        """timeout bounds how long a follower waits (TimeoutError). retry(error) returning True
+        means the leader's failure was its own (e.g. its deadline), so followers start over."""
+        wait_until = None if timeout is None else time.monotonic() + timeout
+        while True:
+            leader = False
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    self.followers += 1
+                elif self.max_keys and len(self._calls) >= self.max_keys:
+                    self.bypassed += 1
+                else:
+                    leader = True
+                    call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                    self.leaders += 1
+                    self.peak_in_flight = max(self.peak_in_flight, len(self._calls))
+
+            if call is None:
+                return fn()
+            if leader:
+                break
+
+            remaining = None if wait_until is None else max(0.0, wait_until - time.monotonic())
+            if not call['done'].wait(remaining):
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError("Timed out waiting for an identical request in flight")
+            if call['error'] is None:
+                return call['result']
+            if not (retry and retry(call['error'])):
+                raise call['error']
+            with self._lock:
+                self.retries += 1
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+    def stats(self):
+        with self._lock:
+            calls = self.leaders + self.followers
+            return {
+                'in_flight': len(self._calls),
+                'max_keys': self.max_keys,
+                'peak_in_flight': self.peak_in_flight,
+                'leaders': self.leaders,
+                'coalesced': self.followers,
+                'bypassed': self.bypassed,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'retries': self.retries,
+                'coalesced_ratio': round(self.followers / calls, 4) if calls else 0.0
+            }
+
+# Content-addressed cache of finished syntheses
+class SynthesisCache:
+    """Bounded LRU map from synthesis parameters to audio already saved on disk"""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text, voice_id, service, speed=1.0, pitch=1.0, ssml=False, output_format=None, bitrate=None):
+        normalized_text = ' '.join(unicodedata.normalize('NFC', text).split())
+        payload = json.dumps(
+            [normalized_text, voice_id, service, round(float(speed), 3), round(float(pitch), 3), bool(ssml),
+             output_format, bitrate],
+            ensure_ascii=False
         )
-        await communicate.save(temp_file)
-        return temp_file
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        return self.lookup(key)[1]
+
+    def lookup(self, *keys):
+        """(key, entry) for the first cached key, else (None, None); counts as one hit or miss"""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and not os.path.exists(entry['filepath']):
+                    # The audio file was removed behind our back; treat as a miss
+                    del self._entries[key]
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, entry
+            self.misses += 1
+            return None, None
+
+    def put(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+synthesis_cache = SynthesisCache(app.config['SYNTHESIS_CACHE_SIZE'])
+synthesis_flight = SingleFlight(app.config['SYNTHESIS_FLIGHT_MAX_KEYS'])  # Identical requests already synthesizing
+
+# Background event loops for Edge-TTS
+class BackgroundEventLoop:
+    """Long-lived asyncio event loop running in a dedicated daemon thread"""
+    def __init__(self, name):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine on this loop and return a concurrent.futures.Future"""
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled():
+                self.cancelled += 1
+            elif future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'running': self.loop.is_running(),
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled
+            }
+
+    def shutdown(self, timeout=5.0):
+        """Cancel pending tasks, stop the loop and join its thread"""
+        if self.loop.is_closed():
+            return
+
+        async def _cancel_pending():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_cancel_pending(), self.loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error cancelling tasks on {self.name}: {str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+
+class EventLoopPool:
+    """Small pool of background event loops; work goes to the least busy loop"""
+    def __init__(self, size, name='edge-tts-loop'):
+        self.loops = [BackgroundEventLoop(f"{name}-{i}") for i in range(max(1, size))]
+        self.pid = os.getpid()
+
+    def submit(self, coro):
+        loop = min(self.loops, key=lambda l: l.in_flight)
+        return loop.submit(coro)
+
+    def stats(self):
+        loops = [l.stats() for l in self.loops]
+        return {
+            'loops': len(loops),
+            'in_flight': sum(l['in_flight'] for l in loops),
+            'submitted': sum(l['submitted'] for l in loops),
+            'completed': sum(l['completed'] for l in loops),
+            'failed': sum(l['failed'] for l in loops),
+            'cancelled': sum(l['cancelled'] for l in loops),
+            'per_loop': loops
+        }
+
+    def shutdown(self, timeout=5.0):
+        for loop in self.loops:
+            loop.shutdown(timeout)
+
+
+_edge_loop_pool = None
+_edge_loop_pool_lock = threading.Lock()
+
+def get_edge_loop_pool():
+    """Return the process-wide loop pool, (re)creating it lazily after a fork"""
+    global _edge_loop_pool
+    with _edge_loop_pool_lock:
+        if _edge_loop_pool is None or _edge_loop_pool.pid != os.getpid():
+            _edge_loop_pool = EventLoopPool(app.config['EDGE_LOOP_WORKERS'])
+            logger.info(f"Started {len(_edge_loop_pool.loops)} Edge-TTS event loop(s)")
+        return _edge_loop_pool
+
+def edge_loop_stats():
+    if _edge_loop_pool is None or _edge_loop_pool.pid != os.getpid():
+        return {'loops': 0, 'in_flight': 0, 'submitted': 0, 'completed': 0,
+                'failed': 0, 'cancelled': 0, 'per_loop': []}
+    return _edge_loop_pool.stats()
+
+@atexit.register
+def shutdown_edge_loop_pool():
+    global _edge_loop_pool
+    with _edge_loop_pool_lock:
+        if _edge_loop_pool is not None and _edge_loop_pool.pid == os.getpid():
+            _edge_loop_pool.shutdown()
+        _edge_loop_pool = None
+
+def build_edge_communicate(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    speed = max(0.5, min(2.0, float(speed)))
+    pitch = max(0.9, min(1.1, float(pitch)))
+    
+    rate = None
+    if speed != 1.0 or pitch != 1.0:
+        rate = f"{int((speed - 1) * 100)}%"
+        if speed > 1.0:
+            rate = f"+{rate}"
+        pitch_adjust = int((pitch - 1) * 5)
+        if pitch_adjust != 0:
+            rate += f"{pitch_adjust:+}%"
+
+    content = f"<speak>{text}</speak>" if ssml else text
+
+    import edge_tts
+    return edge_tts.Communicate(
+        text=content,
+        voice=voice_id,
+        rate=rate if rate else "+0%"
+    )
+
+async def async_generate_with_edge(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    """Collect Edge-TTS audio chunks in memory"""
+    try:
+        communicate = build_edge_communicate(text, voice_id, speed, pitch, ssml)
+
+        audio_data = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio_data.extend(chunk["data"])
+        return bytes(audio_data) if audio_data else None
     except Exception as e:
         logger.error(f"Edge-TTS error: {str(e)}")
         return None
 
-def generate_with_edge(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+def submit_edge_synthesis(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    """Schedule an Edge-TTS synthesis on the background loops and return its future"""
+    return get_edge_loop_pool().submit(
+        async_generate_with_edge(text, voice_id, speed, pitch, ssml)
+    )
+
+@with_circuit_breaker('edge')
+@instrument_engine('edge', 'voice_id')
+def generate_with_edge(text, voice_id, speed=1.0, pitch=1.0, ssml=False, timeout=None):
+    timeout = app.config['EDGE_TTS_TIMEOUT'] if timeout is None else min(timeout, app.config['EDGE_TTS_TIMEOUT'])
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        temp_file = loop.run_until_complete(
-            async_generate_with_edge(text, voice_id, speed, pitch, ssml)
-        )
-        loop.close()
-        
-        if temp_file and os.path.exists(temp_file):
-            with open(temp_file, 'rb') as f:
-                audio_data = f.read()
-            os.remove(temp_file)
-            return audio_data
-        return None
+        future = submit_edge_synthesis(text, voice_id, speed, pitch, ssml)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.error(f"Edge-TTS timed out after {timeout:.1f}s")
+            return None
     except Exception as e:
         logger.error(f"Edge-TTS sync error: {str(e)}")
         return None
 
-def generate_with_gtts(text, lang='en'):
+@with_circuit_breaker('gtts')
+@instrument_engine('gtts', 'lang')
+def generate_with_gtts(text, lang='en', timeout=None):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            temp_path = tmp_file.name
-        
-        tts = gTTS(text=text, lang=lang)
-        tts.save(temp_path)
-        
-        with open(temp_path, 'rb') as f:
-            audio_data = f.read()
-        
-        os.remove(temp_path)
-        return audio_data
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        tts = gTTS(text=text, lang=lang, timeout=timeout)
+        tts.write_to_fp(buffer)
+        return buffer.getvalue() or None
     except Exception as e:
         logger.error(f"gTTS error: {str(e)}")
         return None
 
-def generate_with_polly(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+# Local Coqui engine: offline fallback using each voice's coqui_fallback model
+def parse_coqui_model(spec):
+    """'en-vctk-vits--female' -> ('tts_models/en/vctk/vits', 'female')"""
+    name, _, speaker_hint = spec.partition('--')
+    language, dataset, model = name.split('-', 2)
+    return f"tts_models/{language}/{dataset}/{model}", speaker_hint or None
+
+@lru_cache(maxsize=1)
+def coqui_model_manager():
+    from TTS.api import TTS
+    from TTS.utils.manage import ModelManager
+    return ModelManager(models_file=TTS.get_models_file_path(), progress_bar=False, verbose=False)
+
+@lru_cache(maxsize=1)
+def coqui_model_names():
+    """Every model name Coqui can download (read from the package's bundled model list)"""
+    return frozenset(coqui_model_manager().list_models())
+
+def coqui_model_downloaded(model_name):
+    return os.path.isdir(os.path.join(coqui_model_manager().output_prefix, model_name.replace('/', '--')))
+
+def catalog_coqui_models():
+    return sorted({parse_coqui_model(voice['coqui_fallback'])[0]
+                   for voices in VOICES.values() for voice in voices if voice.get('coqui_fallback')})
+
+def download_coqui_models():
+    """Fetch every catalog fallback model at deploy time, so requests never download; returns
+    the names that could not be fetched"""
+    failed = []
+    for model_name in catalog_coqui_models():
+        if model_name not in coqui_model_names():
+            logger.error(f"{model_name} is not a Coqui model")
+            failed.append(model_name)
+            continue
+        try:
+            coqui_model_manager().download_model(model_name)
+            logger.info(f"Coqui model {model_name} ready")
+        except Exception as e:
+            logger.error(f"Coqui model download failed for {model_name}: {str(e)}")
+            failed.append(model_name)
+    return failed
+
+class CoquiModelCache:
+    """Loaded Coqui models, least recently used evicted once their weights exceed the memory budget.
+
+    Failed loads are remembered for retry_failed_after seconds so a missing or broken model is
+    not reloaded on every request."""
+    def __init__(self, max_bytes, retry_failed_after, allow_download=False):
+        self.max_bytes = max_bytes
+        self.retry_failed_after = retry_failed_after
+        self.allow_download = allow_download
+        self.total_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._models = OrderedDict()  # model_name -> {'tts', 'bytes', 'lock'}
+        self._lock = threading.Lock()
+        self._loading = SingleFlight()
+        self._pending = set()  # Models being loaded by a background thread
+        self._failed = {}  # model_name -> (monotonic time, error message)
+
+    @staticmethod
+    def _model_bytes(tts):
+        total = 0
+        synthesizer = tts.synthesizer
+        for model in (getattr(synthesizer, 'tts_model', None), getattr(synthesizer, 'vocoder_model', None)):
+            if model is not None:
+                total += sum(p.numel() * p.element_size() for p in model.parameters())
+        return total
+
+    def _recent_failure(self, model_name):
+        failure = self._failed.get(model_name)
+        if failure and time.monotonic() - failure[0] < self.retry_failed_after:
+            return failure[1]
+        return None
+
+    def get(self, model_name):
+        with self._lock:
+            entry = self._models.get(model_name)
+            if entry:
+                self._models.move_to_end(model_name)
+                self.hits += 1
+                return entry
+            error = self._recent_failure(model_name)
+        if error:
+            raise RuntimeError(f"Coqui model {model_name} failed to load recently: {error}")
+        return self._loading.do(model_name, lambda: self._load(model_name))
+
+    def loaded(self, model_name):
+        """True if the model is in memory; otherwise start loading it in the background so
+        a request never waits on a load"""
+        with self._lock:
+            if model_name in self._models:
+                return True
+            if model_name in self._pending or self._recent_failure(model_name):
+                return False
+            self._pending.add(model_name)
+        threading.Thread(target=self._load_in_background, args=(model_name,),
+                         name='coqui-load', daemon=True).start()
+        return False
+
+    def _load_in_background(self, model_name):
+        try:
+            self.get(model_name)
+        except Exception as e:
+            logger.warning(f"Background load of Coqui model {model_name} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(model_name)
+
+    def _load(self, model_name):
+        try:
+            if model_name not in coqui_model_names():
+                raise ValueError(f"{model_name} is not a Coqui model")
+            if not self.allow_download and not coqui_model_downloaded(model_name):
+                raise FileNotFoundError(f"{model_name} is not downloaded (run app.py --download-coqui-models)")
+            from TTS.api import TTS
+            started = time.perf_counter()
+            tts = TTS(model_name=model_name, progress_bar=False, gpu=False)
+        except Exception as e:
+            with self._lock:
+                self._failed[model_name] = (time.monotonic(), str(e))
+            raise
+        entry = {'tts': tts, 'bytes': self._model_bytes(tts), 'lock': threading.Lock()}
+        logger.info(f"Loaded Coqui model {model_name} ({entry['bytes'] / 2**20:.0f} MB) "
+                    f"in {time.perf_counter() - started:.1f}s")
+
+        with self._lock:
+            self._failed.pop(model_name, None)
+            self._models[model_name] = entry
+            self.total_bytes += entry['bytes']
+            self.loads += 1
+            # Always keep the model just loaded, even if it alone exceeds the budget
+            while self.total_bytes > self.max_bytes and len(self._models) > 1:
+                evicted_name, evicted = self._models.popitem(last=False)
+                self.total_bytes -= evicted['bytes']
+                self.evictions += 1
+                logger.info(f"Evicted Coqui model {evicted_name}")
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'models': list(self._models.keys()),
+                'memory_mb': round(self.total_bytes / 2**20, 1),
+                'max_memory_mb': round(self.max_bytes / 2**20, 1),
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'failed': {name: error for name, (_, error) in self._failed.items()}
+            }
+
+coqui_models = CoquiModelCache(
+    app.config['COQUI_MAX_MEMORY_MB'] * 2**20,
+    app.config['COQUI_RETRY_FAILED_AFTER'],
+    app.config['COQUI_ALLOW_DOWNLOAD']
+)
+
+def coqui_available():
+    return app.config['COQUI_ENABLED'] and importlib.util.find_spec('TTS') is not None
+
+if app.config['COQUI_ENABLED'] and importlib.util.find_spec('TTS') is None:
+    logger.warning("COQUI_ENABLED is set but the TTS package is not installed (pip install TTS==0.22.0); "
+                   "the offline Coqui fallback is disabled")
+
+def coqui_ready(model_spec):
+    """Whether a request may use this Coqui model now: only once it is loaded, since loading
+    takes longer than any request budget"""
+    return coqui_available() and coqui_models.loaded(parse_coqui_model(model_spec)[0])
+
+def encode_wav(samples, sample_rate):
+    """Float samples in [-1, 1] -> 16-bit mono WAV bytes"""
+    import numpy as np
+    pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+@with_circuit_breaker('coqui', 'model_spec', key=lambda spec: parse_coqui_model(spec)[0])
+@instrument_engine('coqui', 'model_spec')
+def generate_with_coqui(text, model_spec, gender=None):
     try:
-        if not polly_client:
-            raise Exception("Amazon Polly client not initialized")
-        
-        speed_percentage = f"{int(speed * 100)}%"
-        pitch_semitones = str(int((pitch - 1.0) * 12))
-        
-        ssml_text = f"""
-        <speak>
-            <prosody rate="{speed_percentage}" pitch="{pitch_semitones}st">
-                {text}
-            </prosody>
-        </speak>
-        """ if ssml else text
+        if not coqui_available():
+            return None
 
+        model_name, speaker_hint = parse_coqui_model(model_spec)
+        entry = coqui_models.get(model_name)
+        tts = entry['tts']
+
+        speaker = None
+        if tts.is_multi_speaker:
+            hint = speaker_hint or gender
+            if hint in (tts.speakers or []):
+                speaker = hint
+            elif hint == 'female':
+                speaker = app.config['COQUI_FEMALE_SPEAKER']
+            elif hint == 'male':
+                speaker = app.config['COQUI_MALE_SPEAKER']
+            else:
+                speaker = tts.speakers[0]
+
+        # Model instances are not safe for concurrent inference
+        with entry['lock']:
+            samples = tts.tts(text=text, speaker=speaker)
+            sample_rate = tts.synthesizer.output_sample_rate
+        return encode_wav(samples, sample_rate)
+    except Exception as e:
+        logger.error(f"Coqui TTS error: {str(e)}")
+        return None
+
+def detect_audio_format(audio_data):
+    """File extension for encoded audio, from its magic bytes"""
+    if audio_data[:4] == b'RIFF':
+        return 'wav'
+    if audio_data[:4] == b'OggS':
+        return 'ogg'
+    return 'mp3'
+
+# Output formats: (file extension, ffmpeg encoder arguments, default bitrate in kbps)
+OUTPUT_FORMATS = {
+    'mp3': ('mp3', ['-c:a', 'libmp3lame', '-f', 'mp3'], 64),
+    'ogg': ('ogg', ['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'], 32),
+    'wav': ('wav', ['-c:a', 'pcm_s16le', '-f', 'wav'], None)
+}
+OUTPUT_FORMAT_ALIASES = {'opus': 'ogg', 'ogg/opus': 'ogg'}
+BITRATE_RANGE = (6, 320)  # kbps accepted from clients
+
+def transcode_audio(audio_data, output_format, bitrate=None):
+    """Re-encode audio bytes with ffmpeg; raises on failure"""
+    _, encoder_args, default_bitrate = OUTPUT_FORMATS[output_format]
+    command = [app.config['FFMPEG_PATH'], '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0', '-vn']
+    if default_bitrate:
+        command += ['-b:a', f"{bitrate or default_bitrate}k"]
+    command += encoder_args + ['pipe:1']
+    try:
+        result = subprocess.run(command, input=audio_data, capture_output=True,
+                                timeout=app.config['TRANSCODE_TIMEOUT'])
+    except FileNotFoundError:
+        raise Exception("Audio transcoding is unavailable (ffmpeg not found)")
+    if result.returncode != 0 or not result.stdout:
+        raise Exception(f"Transcoding to {output_format} failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+def save_audio_variant(save_result, output_format, bitrate=None):
+    """Transcode a saved file into a sibling '<hash>[.<kbps>k].<ext>', reusing one made earlier"""
+    extension = OUTPUT_FORMATS[output_format][0]
+    if OUTPUT_FORMATS[output_format][2] is None:
+        bitrate = None  # Lossless output has no bitrate
+    source_ext = os.path.splitext(save_result['filepath'])[1].lstrip('.')
+    if extension == source_ext and bitrate is None:
+        return save_result
+
+    suffix = f".{bitrate}k.{extension}" if bitrate else f".{extension}"
+    filepath = os.path.splitext(save_result['filepath'])[0] + suffix
+    audio_url = os.path.splitext(save_result['audio_url'])[0] + suffix
+    if not os.path.exists(filepath):
+        with open(save_result['filepath'], 'rb') as f:
+            audio_data = transcode_audio(f.read(), output_format, bitrate)
+        write_file_atomic(filepath, audio_data)
+        get_audio_janitor().record(os.path.relpath(filepath, AUDIO_FOLDER).replace(os.sep, '/'), len(audio_data))
+    return {"status": "success", "audio_url": audio_url, "filepath": filepath}
+
+def build_polly_request(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    speed_percentage = f"{int(speed * 100)}%"
+    pitch_semitones = str(int((pitch - 1.0) * 12))
+    
+    ssml_text = f"""
+    <speak>
+        <prosody rate="{speed_percentage}" pitch="{pitch_semitones}st">
+            {text}
+        </prosody>
+    </speak>
+    """ if ssml else text
+
+    return {
+        'Text': ssml_text if ssml else text,
+        'OutputFormat': 'mp3',
+        'VoiceId': voice_id,
+        'TextType': 'ssml' if ssml else 'text'
+    }
+
+@with_circuit_breaker('polly')
+@instrument_engine('polly', 'voice_id')
+def generate_with_polly(text, voice_id, speed=1.0, pitch=1.0, ssml=False, timeout=None):
+    """timeout bounds the wait for the whole call, retries included; botocore's own timeouts
+    cannot follow a per-request budget"""
+    polly_client = get_polly_client()
+    if not polly_client:
+        logger.error("Error in Polly generation: Amazon Polly client not initialized")
+        return None
+
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    def synthesize():
         response = polly_client.synthesize_speech(
-            Text=ssml_text if ssml else text,
-            OutputFormat='mp3',
-            VoiceId=voice_id,
-            TextType='ssml' if ssml else 'text'
+            **build_polly_request(text, voice_id, speed, pitch, ssml)
         )
-
         return response['AudioStream'].read()
+
+    try:
+        if timeout is None:
+            return synthesize()
+        future = get_polly_pool().submit(synthesize)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.error(f"Amazon Polly timed out after {timeout:.1f}s")
+            return None
     except (BotoCoreError, ClientError) as error:
         logger.error(f"Amazon Polly error: {str(error)}")
         return None
@@ -912,6 +2236,343 @@ def generate_with_polly(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
         logger.error(f"Error in Polly generation: {str(e)}")
         return None
 
+# Streaming synthesis: generators yielding audio chunks as the engine produces them
+STREAM_END = object()
+
+def stream_with_edge(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    """Relay Edge-TTS chunks from the background loop to a sync generator"""
+    chunks = queue.Queue()
+
+    async def produce():
+        try:
+            communicate = build_edge_communicate(text, voice_id, speed, pitch, ssml)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    chunks.put(chunk["data"])
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(STREAM_END)
+
+    future = get_edge_loop_pool().submit(produce())
+    try:
+        while True:
+            try:
+                item = chunks.get(timeout=app.config['EDGE_TTS_TIMEOUT'])
+            except queue.Empty:
+                raise Exception(f"Edge-TTS stream stalled for {app.config['EDGE_TTS_TIMEOUT']}s")
+            if item is STREAM_END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+def stream_with_polly(text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    polly_client = get_polly_client()
+    if not polly_client:
+        raise Exception("Amazon Polly client not initialized")
+    response = polly_client.synthesize_speech(
+        **build_polly_request(text, voice_id, speed, pitch, ssml)
+    )
+    stream = response['AudioStream']
+    try:
+        for chunk in stream.iter_chunks(chunk_size=4096):
+            yield chunk
+    finally:
+        stream.close()
+
+def stream_with_gtts(text, lang='en'):
+    from gtts import gTTS
+    for chunk in gTTS(text=text, lang=lang).stream():
+        yield chunk
+
+def open_audio_stream(service, text, voice_id, speed=1.0, pitch=1.0, ssml=False):
+    """Return (first_chunk, chunk_iterator) for the engine, or (None, None) if it produced nothing"""
+    if service == 'polly':
+        chunks = stream_with_polly(text, voice_id, speed, pitch, ssml)
+    elif service == 'edge' and voice_id:
+        chunks = stream_with_edge(text, voice_id, speed, pitch, ssml)
+    else:
+        return None, None
+
+    try:
+        first_chunk = next(chunks, None)
+    except Exception as e:
+        logger.error(f"{service} stream error: {str(e)}")
+        chunks.close()
+        return None, None
+
+    if not first_chunk:
+        chunks.close()
+        return None, None
+    return first_chunk, chunks
+
+# Long text segmentation: split at sentence/clause boundaries, synthesize in parallel, stitch in order
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?؟])\s+|(?<=[।॥。！？])\s*|\n+')
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:،、，；])\s*')
+
+def _split_oversized(unit, max_chars):
+    """Break a sentence that is still too long at clause boundaries, then at whitespace"""
+    if len(unit) <= max_chars:
+        return [unit]
+
+    pieces = []
+    for clause in CLAUSE_BOUNDARY.split(unit):
+        clause = clause.strip()
+        if not clause:
+            continue
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+            continue
+        current = ''
+        for word in clause.split():
+            while len(word) > max_chars:  # Scripts written without spaces
+                if current:
+                    pieces.append(current)
+                    current = ''
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            if current and len(current) + 1 + len(word) > max_chars:
+                pieces.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        if current:
+            pieces.append(current)
+    return pieces
+
+def split_text_segments(text, max_chars):
+    """Split text into segments of at most max_chars, packing whole sentences where possible"""
+    if len(text) <= max_chars:
+        return [text]
+
+    segments = []
+    current = ''
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for piece in _split_oversized(sentence, max_chars):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                segments.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        segments.append(current)
+    return segments
+
+def strip_id3_header(audio_data):
+    """Drop a leading ID3v2 tag so MP3 segments can be concatenated frame to frame"""
+    if len(audio_data) < 10 or audio_data[:3] != b'ID3':
+        return audio_data
+    size = 0
+    for byte in audio_data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if audio_data[5] & 0x10 else 0
+    return audio_data[10 + size + footer:]
+
+def synthesize_segments(segments, synthesize, parallelism, max_retries, progress=None):
+    """Synthesize segments concurrently, retrying each one on its own, and join them in order"""
+    done = [0]
+    done_lock = threading.Lock()
+
+    def run(index, segment):
+        for attempt in range(max_retries + 1):
+            audio_data = synthesize(segment)
+            if audio_data:
+                if progress:
+                    with done_lock:
+                        done[0] += 1
+                        progress(done[0], len(segments))
+                return audio_data
+            if attempt < max_retries:
+                logger.warning(f"Segment {index + 1}/{len(segments)} failed, retrying ({attempt + 1}/{max_retries})")
+                time.sleep(0.5 * (2 ** attempt))
+        raise Exception(f"Segment {index + 1}/{len(segments)} failed after {max_retries + 1} attempts")
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, min(parallelism, len(segments))),
+        thread_name_prefix='tts-segment'
+    )
+    try:
+        futures = [executor.submit(run, i, segment) for i, segment in enumerate(segments)]
+        results = [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results[0] + b''.join(strip_id3_header(audio_data) for audio_data in results[1:])
+
+def synthesize_with_service(service, text, voice_id, speed=1.0, pitch=1.0, ssml=False, progress=None, deadline=None):
+    """Synthesize with the voice's own engine, segmenting long plain-text input.
+
+    deadline is a time.monotonic() value; each engine call gets only the time left before it.
+    """
+    if service == 'polly':
+        synthesize = lambda chunk: generate_with_polly(chunk, voice_id, speed, pitch, ssml, timeout=budget_left(deadline))
+    elif service == 'edge' and voice_id:
+        synthesize = lambda chunk: generate_with_edge(chunk, voice_id, speed, pitch, ssml, timeout=budget_left(deadline))
+    else:
+        return None
+
+    if get_breaker(service).is_open():
+        logger.info(f"Skipping {service}: circuit breaker open")
+        return None
+
+    def engine(chunk):
+        if budget_left(deadline) == 0:
+            raise Exception(f"{service} deadline exceeded")
+        return synthesize(chunk)
+
+    # SSML markup cannot be split safely, so it always goes out as one request
+    segments = [text] if ssml else split_text_segments(text, app.config['SEGMENT_MAX_CHARS'])
+    if len(segments) == 1:
+        return synthesize(text) if budget_left(deadline) != 0 else None
+
+    try:
+        return synthesize_segments(
+            segments,
+            engine,
+            app.config['SEGMENT_PARALLELISM'],
+            app.config['SEGMENT_MAX_RETRIES'],
+            progress
+        )
+    except Exception as e:
+        logger.error(f"Segmented {service} synthesis error: {str(e)}")
+        return None
+
+# Hedged requests: race a second engine when the primary is slower than usual
+class HedgeController:
+    """Picks the hedge delay per engine from recent primary latencies and counts race outcomes"""
+    def __init__(self, percentile, default_delay, min_delay, min_samples, window=200):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies = {}  # engine -> recent successful primary latencies
+        self._stats = {'requests': 0, 'hedged': 0, 'primary_wins': 0, 'hedge_wins': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def observe(self, engine, seconds):
+        with self._lock:
+            self._latencies.setdefault(engine, deque(maxlen=self.window)).append(seconds)
+
+    def delay(self, engine):
+        with self._lock:
+            samples = sorted(self._latencies.get(engine, ()))
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, samples[min(len(samples) - 1, int(self.percentile * len(samples)))])
+
+    def count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            engines = list(self._latencies)
+        decided = stats['primary_wins'] + stats['hedge_wins']
+        stats['hedge_rate'] = round(stats['hedged'] / stats['requests'], 4) if stats['requests'] else 0.0
+        stats['hedge_win_ratio'] = round(stats['hedge_wins'] / decided, 4) if decided else 0.0
+        stats['delays'] = {engine: round(self.delay(engine), 3) for engine in engines}
+        return stats
+
+hedge_controller = HedgeController(
+    app.config['HEDGE_PERCENTILE'],
+    app.config['HEDGE_DEFAULT_DELAY'],
+    app.config['HEDGE_MIN_DELAY'],
+    app.config['HEDGE_MIN_SAMPLES']
+)
+
+_hedge_pool = None
+_hedge_pool_pid = None
+_hedge_pool_lock = threading.Lock()
+
+def get_hedge_pool():
+    """Return the process-wide executor for raced engine calls, recreating it after a fork"""
+    global _hedge_pool, _hedge_pool_pid
+    with _hedge_pool_lock:
+        if _hedge_pool is None or _hedge_pool_pid != os.getpid():
+            _hedge_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(2, app.config['HEDGE_WORKERS']),
+                thread_name_prefix='tts-hedge'
+            )
+            _hedge_pool_pid = os.getpid()
+        return _hedge_pool
+
+def hedge_alternate(language, voice, speed, pitch, deadline):
+    """Second engine to race: an equivalent catalog voice on another engine, else gTTS"""
+    equivalent = VOICE_INDEX.equivalent(language, voice)
+    if equivalent and not get_breaker(equivalent['service']).is_open():
+        service = equivalent['service']
+        return {
+            'name': equivalent['name'],
+            'synthesize': lambda text: synthesize_with_service(
+                service, text, equivalent['id'], speed, pitch, False, None, deadline
+            )
+        }
+    if voice.get('service', 'edge') != 'gtts' and not get_breaker('gtts').is_open():
+        lang_code = GTTS_LANG_CODES.get(language, "en")
+        return {
+            'name': 'gTTS',
+            'synthesize': lambda text: generate_with_gtts(text, lang=lang_code, timeout=budget_left(deadline))
+        }
+    return None
+
+def hedged_synthesize(language, voice, text, speed=1.0, pitch=1.0, deadline=None):
+    """Start the primary engine; if it is slower than its usual latency percentile, race an
+    alternate engine and take the first audio. Returns (audio_data, alternate name or None).
+
+    A loser that has not started is cancelled; one already talking to its provider cannot be
+    interrupted, so it finishes in the background and its result is discarded.
+    """
+    service = voice.get('service', 'edge')
+    pool = get_hedge_pool()
+    started = time.monotonic()
+    hedge_controller.count('requests')
+
+    primary = pool.submit(synthesize_with_service, service, text, voice['id'], speed, pitch, False, None, deadline)
+
+    def record_latency(future):
+        # Recorded even when the hedge won, so slow primaries still shape the delay
+        if not future.cancelled() and future.exception() is None and future.result():
+            hedge_controller.observe(service, time.monotonic() - started)
+    primary.add_done_callback(record_latency)
+
+    wait = hedge_controller.delay(service)
+    if deadline is not None:
+        wait = min(wait, budget_left(deadline))
+    done, _ = concurrent.futures.wait([primary], timeout=wait)
+    alternate = None if done else hedge_alternate(language, voice, speed, pitch, deadline)
+    if not alternate:
+        audio_data = primary.result()
+        hedge_controller.count('primary_wins' if audio_data else 'failed')
+        return audio_data, None
+
+    hedge_controller.count('hedged')
+    logger.info(f"Hedging {service} after {wait:.2f}s with {alternate['name']}")
+    pending = {primary: None, pool.submit(alternate['synthesize'], text): alternate['name']}
+    while pending:
+        done, _ = concurrent.futures.wait(pending, timeout=budget_left(deadline),
+                                          return_when=concurrent.futures.FIRST_COMPLETED)
+        if not done:
+            break  # Deadline spent
+        for future in done:
+            winner = pending.pop(future)
+            audio_data = future.result() if future.exception() is None else None
+            if audio_data:
+                for loser in pending:
+                    loser.cancel()
+                hedge_controller.count('hedge_wins' if winner else 'primary_wins')
+                return audio_data, winner
+
+    hedge_controller.count('failed')
+    return None, None
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
@@ -960,10 +2621,11 @@ def auth_status():
 @app.route('/api/auth/google')
 def google_login():
     redirect_uri = url_for('google_authorize', _external=True)
-    return google.authorize_redirect(redirect_uri)
+    return get_oauth_client('google').authorize_redirect(redirect_uri)
 
 @app.route('/api/auth/google/authorize')
 def google_authorize():
+    google = get_oauth_client('google')
     token = google.authorize_access_token()
     user_info = google.get('userinfo').json()
     
@@ -993,10 +2655,11 @@ def google_authorize():
 @app.route('/api/auth/github')
 def github_login():
     redirect_uri = url_for('github_authorize', _external=True)
-    return github.authorize_redirect(redirect_uri)
+    return get_oauth_client('github').authorize_redirect(redirect_uri)
 
 @app.route('/api/auth/github/authorize')
 def github_authorize():
+    github = get_oauth_client('github')
     token = github.authorize_access_token()
     resp = github.get('user')
     user_info = resp.json()
@@ -1229,6 +2892,7 @@ def create_checkout_session():
     }.get(plan)
     
     try:
+        stripe = get_stripe()
         checkout_session = stripe.checkout.Session.create(
             payment_method_types=['card'],
             line_items=[{
@@ -1256,6 +2920,7 @@ def payment_canceled():
 def stripe_webhook():
     payload = request.data
     sig_header = request.headers.get('Stripe-Signature')
+    stripe = get_stripe()
     
     try:
         event = stripe.Webhook.construct_event(
@@ -1273,34 +2938,77 @@ def stripe_webhook():
     
     return jsonify({'status': 'success'})
 
+# /api/voices is served from serialized payloads built once per language/fields slice
+VOICE_FIELDS = ('id', 'name', 'gender', 'service', 'style', 'description',
+                'sample_text', 'age_range', 'mood', 'use_cases')
+
+VOICE_SUMMARIES = {
+    lang: [{
+        'id': voice.get('id', voice.get('name', '')),
+        'name': voice.get('name', 'Unnamed Voice'),
+        'gender': voice.get('gender', 'unknown'),
+        'service': voice.get('service', 'edge'),
+        'style': voice.get('style', 'neutral'),
+        'description': voice.get('description', ''),
+        'sample_text': voice.get('sample_text', ''),
+        'age_range': voice.get('age_range', ''),
+        'mood': voice.get('mood', ''),
+        'use_cases': voice.get('use_cases', [])
+    } for voice in voices]
+    for lang, voices in VOICES.items()
+}
+
+@lru_cache(maxsize=64)
+def voices_payload(language=None, fields=None):
+    """Return (json_body, gzipped_body, etag) for a slice of the catalog"""
+    languages = [language] if language else list(VOICE_SUMMARIES.keys())
+    voices = {
+        lang: [{k: summary[k] for k in fields} if fields else summary for summary in VOICE_SUMMARIES[lang]]
+        for lang in languages
+    }
+    body = json.dumps(
+        {'status': 'success', 'languages': languages, 'voices': voices},
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode('utf-8')
+    return body, gzip.compress(body, 9), hashlib.sha256(body).hexdigest()[:32]
+
+# Build the full catalog and per-language slices up front
+voices_payload()
+for _language in VOICE_SUMMARIES:
+    voices_payload(_language)
+
+mark_startup_phase('voice_catalog')
+
 @app.route('/api/voices', methods=['GET'])
 def get_voices():
-    try:
-        response = {
-            'status': 'success',
-            'languages': list(VOICES.keys()),
-            'voices': {}
-        }
-        
-        for lang, voices in VOICES.items():
-            response['voices'][lang] = []
-            for voice in voices:
-                response['voices'][lang].append({
-                    'id': voice.get('id', voice.get('name', '')),
-                    'name': voice.get('name', 'Unnamed Voice'),
-                    'gender': voice.get('gender', 'unknown'),
-                    'service': voice.get('service', 'edge'),
-                    'style': voice.get('style', 'neutral'),
-                    'description': voice.get('description', ''),
-                    'sample_text': voice.get('sample_text', ''),
-                    'age_range': voice.get('age_range', ''),
-                    'mood': voice.get('mood', ''),
-                    'use_cases': voice.get('use_cases', [])
-                })
-        
-        return jsonify(response)
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    language = request.args.get('language') or None
+    if language and language not in VOICE_SUMMARIES:
+        return jsonify({'status': 'error', 'message': 'Unknown language'}), 404
+
+    fields = None
+    if request.args.get('fields'):
+        requested = {f.strip() for f in request.args['fields'].split(',') if f.strip()}
+        unknown = requested.difference(VOICE_FIELDS)
+        if unknown:
+            return jsonify({'status': 'error', 'message': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+        fields = tuple(f for f in VOICE_FIELDS if f in requested)
+
+    body, gzipped_body, etag = voices_payload(language, fields)
+    use_gzip = request.accept_encodings.quality('gzip') > 0
+    if use_gzip:
+        etag += '-gz'  # Each encoding is a distinct representation
+
+    response = Response(status=304) if request.if_none_match.contains(etag) else Response(
+        gzipped_body if use_gzip else body,
+        mimetype='application/json'
+    )
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={app.config['VOICES_CACHE_MAX_AGE']}"
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip and response.status_code == 200:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
         
 # 1. First define the admin_required decorator
 def admin_required(f):
@@ -1325,10 +3033,10 @@ def admin_voice_config():
     return jsonify({
         'status': 'success',
         'languages': sorted(VOICES.keys()),
-        'voice_counts': {lang: len(voices) for lang, voices in VOICES.items()},
+        'voice_counts': VOICE_INDEX.voice_counts,
         'services': {
-            'edge_tts': any(v.get('service') == 'edge' for voices in VOICES.values() for v in voices),
-            'polly': any(v.get('service') == 'polly' for voices in VOICES.values() for v in voices),
+            'edge_tts': 'edge' in VOICE_INDEX.services,
+            'polly': 'polly' in VOICE_INDEX.services,
             'gtts': bool(GTTS_LANG_CODES)
         }
     })
@@ -1337,6 +3045,7 @@ def admin_voice_config():
 @admin_required
 def admin_system_status():
     """Get system health metrics"""
+    import psutil
     if not hasattr(app, 'start_time'):
         app.start_time = datetime.utcnow()
     
@@ -1352,7 +3061,16 @@ def admin_system_status():
             'start_time': app.start_time.isoformat(),
             'uptime': (datetime.utcnow() - app.start_time).total_seconds(),
             'config_keys': [k for k in app.config.keys() if not k.startswith('SECRET')]
-        }
+        },
+        'startup': startup_report(),
+        'edge_tts': edge_loop_stats(),
+        'synthesis_cache': synthesis_cache.stats(),
+        'synthesis_flight': synthesis_flight.stats(),
+        'jobs': get_job_queue().stats(),
+        'coqui': coqui_models.stats(),
+        'audio_gc': get_audio_janitor().stats(),
+        'circuit_breakers': {engine: breaker.stats() for engine, breaker in list(engine_breakers.items())},
+        'hedging': hedge_controller.stats()
     })
 
 @app.route('/api/admin/auth-status', methods=['GET'])
@@ -1379,110 +3097,786 @@ def voices_debug():
     from pprint import pformat
     return f"<pre>{pformat(VOICES)}</pre>", 200
 
-@app.route('/api/generate_tts', methods=['POST'])
-@csrf.exempt
-def generate_tts():  # Removed @login_required decorator
-    if not request.is_json:
-        return jsonify({'status': 'error', 'message': 'Content-Type must be application/json'}), 400
+def parse_tts_request(data, char_limit):
+    """Validate a synthesis request body; returns (params, None) or (None, (error_body, status_code))"""
+    if not isinstance(data, dict):
+        return None, ({'status': 'error', 'message': 'Invalid JSON body'}, 400)
 
-    data = request.get_json()
     text = data.get('text', '').strip()
     language = data.get('language', '')
     voice_id = data.get('voice_id', '')
     use_ssml = data.get('use_ssml', False)
-    speed = float(data.get('speed', 1.0))
-    pitch = float(data.get('pitch', 1.0))
+    try:
+        speed = float(data.get('speed', 1.0))
+        pitch = float(data.get('pitch', 1.0))
+    except (TypeError, ValueError):
+        return None, ({'status': 'error', 'message': 'Speed and pitch must be numbers'}, 400)
+
+    output_format = data.get('format') or None
+    if output_format:
+        output_format = str(output_format).lower()
+        output_format = OUTPUT_FORMAT_ALIASES.get(output_format, output_format)
+        if output_format not in OUTPUT_FORMATS:
+            return None, ({'status': 'error', 'message': 'Format must be one of: mp3, ogg, opus, wav'}, 400)
+
+    bitrate = data.get('bitrate') or None
+    if bitrate:
+        try:
+            bitrate = int(str(bitrate).lower().rstrip('k'))
+        except ValueError:
+            bitrate = 0
+        if not BITRATE_RANGE[0] <= bitrate <= BITRATE_RANGE[1]:
+            return None, ({
+                'status': 'error',
+                'message': f"Bitrate must be between {BITRATE_RANGE[0]} and {BITRATE_RANGE[1]} kbps"
+            }, 400)
+        if not output_format:
+            return None, ({'status': 'error', 'message': 'Bitrate requires a format'}, 400)
     
     if not text or not language or not voice_id:
-        return jsonify({'status': 'error', 'message': 'Text, language and voice_id are required'}), 400
+        return None, ({'status': 'error', 'message': 'Text, language and voice_id are required'}, 400)
     
-    # For anonymous users, apply basic limits
-    char_limit = 5000  # Example limit for anonymous users
     if len(text) > char_limit:
-        return jsonify({
+        return None, ({
             'status': 'error',
             'message': f'Text exceeds {char_limit} character limit for anonymous usage',
             'max_limit': char_limit,
             'code': 'char_limit_exceeded'
-        }), 400
+        }, 400)
 
-    try:
-        selected_voice = next((v for v in VOICES.get(language, []) if v.get('id') == voice_id), None)
-        
-        if not selected_voice:
-            return jsonify({'status': 'error', 'message': 'Invalid voice selection'}), 400
+    return {
+        'text': text,
+        'language': language,
+        'voice_id': voice_id,
+        'use_ssml': use_ssml,
+        'speed': speed,
+        'pitch': pitch,
+        'output_format': output_format,
+        'bitrate': bitrate,
+        'hedge': bool(data.get('hedge', False))
+    }, None
 
-        service = selected_voice.get('service', 'edge')
-        audio_data = None
-        
-        if service == 'polly':
-            audio_data = generate_with_polly(text, selected_voice['id'], speed, pitch, use_ssml)
-        elif service == 'edge' and selected_voice.get('id'):
-            audio_data = generate_with_edge(text, selected_voice['id'], speed, pitch, use_ssml)
-        
-        if not audio_data:
-            logger.info("Falling back to gTTS")
-            lang_code = GTTS_LANG_CODES.get(language, "en")
-            audio_data = generate_with_gtts(text, lang=lang_code)
-            if audio_data:
-                selected_voice['name'] += " (gTTS Fallback)"
+def perform_tts(text, language, voice_id, use_ssml=False, speed=1.0, pitch=1.0, progress=None,
+                output_format=None, bitrate=None, budget=None, hedge=False):
+    """Synthesize and store one request; raises ValueError for an unknown voice.
 
-        if not audio_data:
-            raise Exception("All TTS methods failed")
+    budget (seconds) bounds the whole engine chain: the primary engine may use
+    TTS_PRIMARY_BUDGET_SHARE of it and the fallbacks get whatever is left. With hedge,
+    short plain-text prompts race a second engine when the primary is slow.
+    """
+    with timing_span('lookup'):
+        selected_voice = VOICE_INDEX.find(language, voice_id)
+    
+    if not selected_voice:
+        raise ValueError('Invalid voice selection')
 
-        extension = "mp3" if service in ['gtts', 'polly'] else "wav"
-        save_result = save_audio_file(audio_data, voice_id, extension)
-        if save_result['status'] != 'success':
-            raise Exception(save_result['message'])
+    service = selected_voice.get('service', 'edge')
+    voice_name = selected_voice['name']
+    with timing_span('cache'):
+        cache_key = SynthesisCache.make_key(text, voice_id, service, speed, pitch, use_ssml, output_format, bitrate)
+        native_key = SynthesisCache.make_key(text, voice_id, service, speed, pitch, use_ssml)
+        # A requested format can also be served by transcoding the cached native audio
+        # (without a format both keys are the same)
+        found_key, found = synthesis_cache.lookup(cache_key, native_key)
+        cached = found if found_key == cache_key else None
+        native = found if found and found_key != cache_key else None
 
-        response = {
-            'status': 'success',
-            'audio_url': save_result['audio_url'],
-            'voice_used': selected_voice['name'],
-            'language': language,
-            'service': service,
-            'parameters': {
-                'speed': speed,
-                'pitch': pitch,
-                'ssml': use_ssml
-            },
-            'voice_metadata': {
-                'style': selected_voice.get('style'),
-                'use_cases': selected_voice.get('use_cases', []),
-                'description': selected_voice.get('description'),
-                'sample_text': selected_voice.get('sample_text'),
-                'age_range': selected_voice.get('age_range'),
-                'mood': selected_voice.get('mood')
-            }
+    if cached:
+        save_result = cached
+    elif native:
+        with timing_span('transcode'):
+            save_result = save_audio_variant(native, output_format, bitrate)
+        synthesis_cache.put(cache_key, {'audio_url': save_result['audio_url'], 'filepath': save_result['filepath']})
+    else:
+        # SSML is engine-specific, so it is never raced on another engine
+        hedging = (hedge and app.config['HEDGE_ENABLED'] and not use_ssml
+                   and len(text) <= app.config['HEDGE_MAX_CHARS'])
+
+        started = time.monotonic()
+        deadline = started + budget if budget else None
+        primary_deadline = started + budget * app.config['TTS_PRIMARY_BUDGET_SHARE'] if budget else None
+
+        def synthesize_and_store():
+            voice_name = selected_voice['name']
+
+            hedge_winner = None
+            with timing_span('synth'):
+                if hedging:
+                    audio_data, hedge_winner = hedged_synthesize(language, selected_voice, text, speed, pitch,
+                                                                 primary_deadline)
+                else:
+                    audio_data = synthesize_with_service(service, text, selected_voice['id'], speed, pitch, use_ssml,
+                                                         progress, primary_deadline)
+
+            # The hedge voice is not the requested one, so treat it like a fallback
+            used_fallback = bool(hedge_winner)
+            if hedge_winner:
+                voice_name += f" (Hedged: {hedge_winner})"
+            if (not audio_data and selected_voice.get('coqui_fallback') and budget_left(deadline) != 0
+                    and coqui_ready(selected_voice['coqui_fallback'])):
+                logger.info("Falling back to local Coqui model")
+                with timing_span('fallback'):
+                    audio_data = generate_with_coqui(text, selected_voice['coqui_fallback'],
+                                                     selected_voice.get('gender', '').lower() or None)
+                if audio_data:
+                    used_fallback = True
+                    voice_name += " (Coqui Fallback)"
+                    TTS_FALLBACKS.inc(service, 'coqui')
+
+            if not audio_data and budget_left(deadline) != 0:
+                logger.info("Falling back to gTTS")
+                lang_code = GTTS_LANG_CODES.get(language, "en")
+                with timing_span('fallback'):
+                    audio_data = generate_with_gtts(text, lang=lang_code, timeout=budget_left(deadline))
+                if audio_data:
+                    used_fallback = True
+                    voice_name += " (gTTS Fallback)"
+                    TTS_FALLBACKS.inc(service, 'gtts')
+
+            if not audio_data:
+                TTS_FAILURES.inc(service)
+                if budget_left(deadline) == 0:
+                    raise DeadlineExceeded(f"TTS deadline of {budget:.0f}s exceeded")
+                raise Exception("All TTS methods failed")
+
+            with timing_span('save'):
+                save_result = save_audio_file(audio_data, detect_audio_format(audio_data))
+            if save_result['status'] != 'success':
+                raise Exception(save_result['message'])
+
+            # Fallback audio is not the requested voice, so don't pin it in the cache
+            if not used_fallback:
+                synthesis_cache.put(native_key, {
+                    'audio_url': save_result['audio_url'],
+                    'filepath': save_result['filepath']
+                })
+
+            if output_format:
+                with timing_span('transcode'):
+                    save_result = save_audio_variant(save_result, output_format, bitrate)
+                if not used_fallback:
+                    synthesis_cache.put(cache_key, {
+                        'audio_url': save_result['audio_url'],
+                        'filepath': save_result['filepath']
+                    })
+            return save_result, voice_name
+
+        # Identical concurrent requests wait for the first one instead of calling the engine again.
+        # Deadline-bound requests (HTTP) and unbounded ones (jobs) never share a flight, a follower
+        # waits at most its own budget, and a leader that ran out of its budget lets followers retry.
+        flight_key = (cache_key, hedging, 'deadline' if budget else 'unbounded')
+        save_result, voice_name = synthesis_flight.do(
+            flight_key,
+            synthesize_and_store,
+            timeout=budget_left(deadline),
+            retry=lambda error: isinstance(error, DeadlineExceeded)
+        )
+
+    return {
+        'status': 'success',
+        'audio_url': save_result['audio_url'],
+        'voice_used': voice_name,
+        'language': language,
+        'service': service,
+        'cached': bool(cached or native),
+        'format': os.path.splitext(save_result['filepath'])[1].lstrip('.'),
+        'parameters': {
+            'speed': speed,
+            'pitch': pitch,
+            'ssml': use_ssml,
+            'format': output_format,
+            'bitrate': bitrate
+        },
+        'voice_metadata': {
+            'style': selected_voice.get('style'),
+            'use_cases': selected_voice.get('use_cases', []),
+            'description': selected_voice.get('description'),
+            'sample_text': selected_voice.get('sample_text'),
+            'age_range': selected_voice.get('age_range'),
+            'mood': selected_voice.get('mood')
         }
-        return jsonify(response)
+    }
 
+@app.route('/api/generate_tts', methods=['POST'])
+@csrf.exempt
+def generate_tts():  # Removed @login_required decorator
+    if not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Content-Type must be application/json'}), 400
+
+    # For anonymous users, apply basic limits
+    params, error = parse_tts_request(request.get_json(), char_limit=5000)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    try:
+        result = perform_tts(budget=app.config['TTS_DEADLINE'], **params)
+        if app.config['SERVER_TIMING_DEBUG']:
+            result['timings'] = timing_report()
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except (DeadlineExceeded, TimeoutError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 504
     except Exception as e:
         logger.error(f"TTS generation error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# COMMENTED OUT BARK TTS ENDPOINT
-# @app.route('/api/bark_tts', methods=['POST'])
-# def bark_tts():
-#     data = request.json
-#     text = data.get("text", "")
-#     speed = float(data.get("speed", 1.0))
-#     pitch = float(data.get("pitch", 1.0))
-#     
-#     output_path = os.path.join(AUDIO_FOLDER, f"bark_{datetime.now().strftime('%Y%m%d%H%M%S')}.wav")
-#     try:
-#         generate_bark_tts(text, output_path, speed=speed, pitch=pitch)
-#         return jsonify({
-#             "status": "success", 
-#             "audio_url": f"/static/audio/{os.path.basename(output_path)}",
-#             "parameters": {
-#                 "speed": speed,
-#                 "pitch": pitch
-#             }
-#         })
-#     except Exception as e:
-#         return jsonify({"status": "error", "message": str(e)})
-								 
+@app.route('/api/generate_tts/stream', methods=['POST'])
+@csrf.exempt
+def generate_tts_stream():
+    """Stream synthesized audio while it is generated and keep a copy in the audio store"""
+    if not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Content-Type must be application/json'}), 400
+
+    params, error = parse_tts_request(request.get_json(), char_limit=5000)
+    if error:
+        return jsonify(error[0]), error[1]
+    # Chunks are relayed as the engine produces them, so the stream is always the engine's MP3
+    if params['output_format'] not in (None, 'mp3') or params['bitrate']:
+        return jsonify({
+            'status': 'error',
+            'message': 'Streaming only supports MP3 at the engine bitrate; use /api/generate_tts for other formats'
+        }), 400
+    text, language, voice_id = params['text'], params['language'], params['voice_id']
+    speed, pitch, use_ssml = params['speed'], params['pitch'], params['use_ssml']
+
+    selected_voice = VOICE_INDEX.find(language, voice_id)
+    if not selected_voice:
+        return jsonify({'status': 'error', 'message': 'Invalid voice selection'}), 400
+
+    service = selected_voice.get('service', 'edge')
+    first_chunk, chunks = open_audio_stream(service, text, selected_voice['id'], speed, pitch, use_ssml)
+
+    if not first_chunk:
+        logger.info("Falling back to gTTS stream")
+        TTS_FALLBACKS.inc(service, 'gtts')
+        service = 'gtts'
+        chunks = stream_with_gtts(text, lang=GTTS_LANG_CODES.get(language, "en"))
+        try:
+            first_chunk = next(chunks, None)
+        except Exception as e:
+            logger.error(f"gTTS stream error: {str(e)}")
+        if not first_chunk:
+            return jsonify({'status': 'error', 'message': 'All TTS methods failed'}), 500
+
+    # The content is not known until the stream ends, so the name comes from a UUID instead
+    filename = sharded_audio_name(uuid.uuid4().hex, 'mp3')
+    filepath = audio_output_path(filename)
+    partial_path = f"{filepath}.part"
+
+    def relay():
+        completed = False
+        try:
+            with open(partial_path, 'wb') as f:
+                f.write(first_chunk)
+                yield first_chunk
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(partial_path, filepath)
+            completed = True
+            get_audio_janitor().record(filename, os.path.getsize(filepath))
+        except Exception as e:
+            logger.error(f"TTS stream error: {str(e)}")
+        finally:
+            chunks.close()
+            if not completed and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    return Response(relay(), mimetype='audio/mpeg', headers={
+        'X-Audio-Url': f"/static/audio/{filename}",
+        'X-TTS-Service': service,
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'  # Let nginx pass chunks through unbuffered
+    })
+
+# Background TTS jobs
+class JobQueue:
+    """Bounded pool of worker threads for TTS jobs, journaled so queued work survives a restart.
+
+    The journal is an append-only JSON-lines file: the first record of a job carries the
+    request, later records carry status/progress updates that are merged on load. Each job
+    records the queue that owns it, and each queue holds an flock on its own owner file for
+    as long as its process lives, so an owner file that can be locked means a dead owner.
+    Periodically the process holding the leader lock re-queues unfinished jobs of dead
+    owners and compacts the journal. Appends take a shared lock on JOURNAL.lock and the
+    compaction rewrite an exclusive one, so no record is lost to the rename.
+    """
+    ACTIVE = ('queued', 'running')
+
+    def __init__(self, journal_path, workers, max_queued, retention, maintenance_interval=300):
+        self.journal_path = journal_path
+        self.retention = retention
+        self.maintenance_interval = maintenance_interval
+        self.pid = os.getpid()
+        self.owner = f"{self.pid}-{uuid.uuid4().hex[:8]}"
+        self.jobs = {}
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._owners_dir = f"{journal_path}.owners"
+        self._owner_lock = self._hold_owner_lock()
+        self._leader_lock = None
+        self.maintain()
+        self._threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._work, name=f"tts-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._maintenance_loop, name='tts-job-maintenance', daemon=True).start()
+
+    @contextmanager
+    def _journal_locked(self, exclusive=False):
+        """Shared lock for appends/reads, exclusive for the compaction rewrite (all processes)"""
+        if not fcntl:
+            yield
+            return
+        with open(f"{self.journal_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _owner_path(self, owner):
+        return os.path.join(self._owners_dir, f"{owner}.lock")
+
+    def _hold_owner_lock(self):
+        if not fcntl:
+            return None
+        os.makedirs(self._owners_dir, exist_ok=True)
+        # Under the journal lock so maintenance never sees the file before it is locked
+        with self._journal_locked():
+            lock_file = open(self._owner_path(self.owner), 'w')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file  # Held for the life of the process
+
+    def _owner_alive(self, owner):
+        if owner == self.owner:
+            return True
+        if not fcntl or not owner or not os.path.exists(self._owner_path(owner)):
+            return False  # Without flock only this process is known to be alive
+        with open(self._owner_path(owner), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            return False
+
+    def _acquire_leader_lock(self):
+        if not fcntl:
+            return True
+        if self._leader_lock is None:
+            lock_file = open(f"{self.journal_path}.leader", 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False  # Another live process leads
+            self._leader_lock = lock_file  # Held for the life of the process
+        return True
+
+    def _read_journal(self):
+        jobs = {}
+        if not os.path.exists(self.journal_path):
+            return jobs
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash
+                jobs.setdefault(record['id'], {}).update(record)
+        return jobs
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with self._journal_locked():
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job['status'] not in self.ACTIVE and job.get('updated_at', 0) < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def maintain(self):
+        """Drop expired jobs from memory; as leader also adopt orphaned jobs and compact the journal"""
+        self._prune()
+        if not self._acquire_leader_lock():
+            return
+
+        cutoff = time.time() - self.retention
+        adopted = []
+        with self._journal_locked(exclusive=True):
+            jobs = {
+                job_id: job for job_id, job in self._read_journal().items()
+                if job.get('status') in self.ACTIVE or job.get('updated_at', 0) >= cutoff
+            }
+            for job in jobs.values():
+                if job['status'] in self.ACTIVE and not self._owner_alive(job.get('owner')):
+                    job.update(status='queued', progress=0, owner=self.owner, updated_at=time.time())
+                    adopted.append(job)
+
+            temp_path = f"{self.journal_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for job in jobs.values():
+                    if job['status'] not in self.ACTIVE:
+                        job.pop('request', None)
+                    f.write(json.dumps(job, ensure_ascii=False) + '\n')
+            os.replace(temp_path, self.journal_path)
+
+            if fcntl and os.path.isdir(self._owners_dir):
+                for name in os.listdir(self._owners_dir):
+                    owner = name[:-len('.lock')]
+                    if not self._owner_alive(owner):
+                        os.remove(self._owner_path(owner))
+
+        requeued = 0
+        for job in sorted(adopted, key=lambda j: j.get('created_at', 0)):
+            with self._lock:
+                self.jobs[job['id']] = job
+            try:
+                self._queue.put_nowait(job['id'])
+                requeued += 1
+            except queue.Full:
+                self._update(job['id'], status='failed', error='Job queue full after restart')
+        if requeued:
+            logger.info(f"Re-queued {requeued} orphaned TTS job(s) from {self.journal_path}")
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(self.maintenance_interval)
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Job journal maintenance error: {str(e)}")
+
+    def submit(self, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'progress': 0,
+            'request': params,
+            'owner': self.owner,
+            'created_at': now,
+            'updated_at': now
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                del self.jobs[job_id]
+            return None
+        self._append(job)
+        return job
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        with self._lock:
+            job = self.jobs[job_id]
+            job.update(fields)
+            if job['status'] not in self.ACTIVE:
+                job.pop('request', None)
+        self._append(dict(fields, id=job_id))
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            job = self.jobs.get(job_id)
+            if not job or 'request' not in job:
+                continue
+            self._update(job_id, status='running')
+
+            def progress(done, total):
+                self._update(job_id, progress=int(done * 100 / total))
+
+            try:
+                params = dict(job['request'])
+                run = perform_bark if params.pop('engine', 'tts') == 'bark' else perform_tts
+                result = run(progress=progress, **params)
+                self._update(job_id, status='completed', progress=100, result=result)
+            except Exception as e:
+                logger.error(f"TTS job {job_id} failed: {str(e)}")
+                self._update(job_id, status='failed', error=str(e))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(job)
+        # Jobs accepted by another worker process are only visible through the journal
+        with self._journal_locked():
+            return self._read_journal().get(job_id)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job['status'] for job in self.jobs.values()]
+        return {
+            'owner': self.owner,
+            'leader': self._leader_lock is not None or not fcntl,
+            'workers': len(self._threads),
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'running': statuses.count('running'),
+            'completed': statuses.count('completed'),
+            'failed': statuses.count('failed')
+        }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide job queue, starting its workers lazily after a fork"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None or _job_queue.pid != os.getpid():
+            # The journal's .lock/.leader/.owners siblings live next to it, out of the source tree
+            journal_path = app.config['JOB_JOURNAL_PATH'] or os.path.join(app.instance_path, 'jobs', 'job_journal.jsonl')
+            os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+            _job_queue = JobQueue(
+                journal_path,
+                app.config['JOB_WORKERS'],
+                app.config['JOB_QUEUE_SIZE'],
+                app.config['JOB_RETENTION'],
+                app.config['JOB_MAINTENANCE_INTERVAL']
+            )
+        return _job_queue
+
+def job_view(job):
+    view = {
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job.get('progress', 0),
+        'created_at': datetime.utcfromtimestamp(job['created_at']).isoformat(),
+        'updated_at': datetime.utcfromtimestamp(job['updated_at']).isoformat(),
+        'status_url': url_for('get_job', job_id=job['id'])
+    }
+    if job['status'] == 'completed':
+        view['audio_url'] = job['result']['audio_url']
+        view['result'] = job['result']
+    elif job['status'] == 'failed':
+        view['error'] = job.get('error')
+    return view
+
+@app.route('/api/jobs', methods=['POST'])
+@csrf.exempt
+def create_job():
+    """Queue a (large) TTS conversion and return immediately with its job id"""
+    if not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Content-Type must be application/json'}), 400
+
+    # Large jobs are for signed-in users; anonymous callers get the same limit as /api/generate_tts
+    char_limit = app.config['JOB_CHAR_LIMIT'] if 'user_id' in session else app.config['FREE_CHAR_LIMIT']
+    params, error = parse_tts_request(request.get_json(), char_limit=char_limit)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    if not VOICE_INDEX.find(params['language'], params['voice_id']):
+        return jsonify({'status': 'error', 'message': 'Invalid voice selection'}), 400
+
+    job = get_job_queue().submit(params)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job queue is full, try again later'}), 503, {'Retry-After': '30'}
+
+    return jsonify({'status': 'success', 'job': job_view(job)}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job_view(job)})
+
+BARK_SPEAKER_KEY = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Bark TTS: models load in a background thread, requests get a fast 503 until they are ready.
+# Long-form text is queued as a job (202) rather than generated inside the request.
+@app.route('/api/bark_tts', methods=['POST'])
+@csrf.exempt
+def bark_tts():
+    if not app.config['BARK_ENABLED']:
+        return jsonify({'status': 'error', 'message': 'Bark TTS is disabled'}), 404
+
+    from bark_tts.generate_bark import bark_status, split_bark_segments, validate_history_prompt, BarkNotReady
+
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    history_prompt = data.get("voice_preset") or None  # e.g. "v2/en_speaker_6", checked against Bark's presets
+    speaker_key = data.get("speaker_key") or None  # Reuse a generated voice across calls
+    if not text:
+        return jsonify({'status': 'error', 'message': 'Text is required'}), 400
+    if len(text) > app.config['BARK_CHAR_LIMIT']:
+        return jsonify({
+            'status': 'error',
+            'message': f"Text exceeds {app.config['BARK_CHAR_LIMIT']} character limit",
+            'max_limit': app.config['BARK_CHAR_LIMIT'],
+            'code': 'char_limit_exceeded'
+        }), 400
+    if history_prompt is not None and not isinstance(history_prompt, str):
+        return jsonify({'status': 'error', 'message': 'voice_preset must be a string'}), 400
+
+    if speaker_key is not None:
+        # Speaker prompts are cached process-wide, so keys are namespaced per signed-in user
+        if 'user_id' not in session:
+            return jsonify({'status': 'error', 'message': 'speaker_key requires sign-in'}), 401
+        if not isinstance(speaker_key, str) or not BARK_SPEAKER_KEY.match(speaker_key):
+            return jsonify({'status': 'error', 'message': 'speaker_key must be 1-64 letters, digits, _ or -'}), 400
+        speaker_key = f"{session['user_id']}:{speaker_key}"
+    
+    try:
+        if not app.config['BARK_SERVER_ADDRESS']:
+            validate_history_prompt(history_prompt)  # The server process validates its own
+
+        # CPU Bark takes tens of seconds per segment, so long-form text must not hold a web worker
+        if len(split_bark_segments(text)) > app.config['BARK_SYNC_SEGMENTS']:
+            job = get_job_queue().submit({
+                'engine': 'bark',
+                'text': text,
+                'history_prompt': history_prompt,
+                'speaker_key': speaker_key
+            })
+            if not job:
+                return jsonify({'status': 'error', 'message': 'Job queue is full, try again later'}), 503, {'Retry-After': '30'}
+            return jsonify({'status': 'success', 'job': job_view(job)}), 202
+
+        return jsonify(perform_bark(text, history_prompt, speaker_key, wait_timeout=app.config['BARK_REQUEST_WAIT']))
+    except BarkNotReady as e:
+        state = None if app.config['BARK_SERVER_ADDRESS'] else bark_status()
+        return jsonify({'status': 'error', 'message': str(e), 'bark': state}), 503, {'Retry-After': '30'}
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Bark TTS error: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def perform_bark(text, history_prompt=None, speaker_key=None, progress=None, wait_timeout=None):
+    """Generate and store Bark audio; in a job (wait_timeout None) it may wait out a model load"""
+    from bark_tts.generate_bark import generate_bark_tts, write_bark_wav, split_bark_segments
+
+    if wait_timeout is None:
+        wait_timeout = app.config['BARK_SERVER_TIMEOUT']
+    filename = sharded_audio_name(uuid.uuid4().hex, 'wav')
+    output_path = audio_output_path(filename)
+    if app.config['BARK_SERVER_ADDRESS']:
+        from bark_tts.bark_server import BarkClient
+        sample_rate, audio_array = BarkClient(app.config['BARK_SERVER_ADDRESS']).generate(
+            text,
+            history_prompt=history_prompt,
+            speaker_key=speaker_key,
+            # Long-form work grows with the segment count, so the wait does too
+            timeout=(app.config['BARK_SERVER_TIMEOUT']
+                     + app.config['BARK_SEGMENT_TIMEOUT'] * len(split_bark_segments(text)))
+        )
+        write_bark_wav(output_path, sample_rate, audio_array)
+    else:
+        generate_bark_tts(
+            text,
+            output_path,
+            wait_timeout=wait_timeout,
+            history_prompt=history_prompt,
+            speaker_key=speaker_key
+        )
+    get_audio_janitor().record(filename, os.path.getsize(output_path))
+    return {
+        "status": "success",
+        "audio_url": f"/static/audio/{filename}"
+    }
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness plus readiness of optional components"""
+    components = {'bark': {'status': 'disabled'}}
+    if app.config['BARK_ENABLED'] and app.config['BARK_SERVER_ADDRESS']:
+        from bark_tts.bark_server import BarkClient
+        try:
+            reply = BarkClient(app.config['BARK_SERVER_ADDRESS']).status()
+            components['bark'] = dict(reply['bark'], server=reply['stats'])
+        except Exception as e:
+            components['bark'] = {'status': 'unreachable', 'error': str(e)}
+    elif app.config['BARK_ENABLED']:
+        from bark_tts.generate_bark import bark_status, check_memory_budget
+        components['bark'] = dict(bark_status(), memory=check_memory_budget(app.config['BARK_WORKER_PRIVATE_MB']))
+
+    ready = all(c['status'] in ('ready', 'disabled') for c in components.values())
+    return jsonify({'status': 'success', 'ready': ready, 'components': components})
+
+def job_queue_stats():
+    if _job_queue is None or _job_queue.pid != os.getpid():
+        return {'queue_depth': 0, 'running': 0}
+    return _job_queue.stats()
+
+def audio_janitor_stats():
+    if _audio_janitor is None or _audio_janitor.pid != os.getpid():
+        return {'files': 0, 'total_bytes': 0}
+    return _audio_janitor.stats()
+
+def cache_ratio(stats):
+    lookups = stats['hits'] + stats['misses']
+    return round(stats['hits'] / lookups, 4) if lookups else 0.0
+
+metrics.register(CounterFunction(
+    'tts_cache_hits_total', 'Cache hits', lambda: {
+        ('synthesis',): synthesis_cache.stats()['hits'],
+        ('coqui_models',): coqui_models.stats()['hits']
+    }, ('cache',)
+))
+metrics.register(GaugeFunction(
+    'tts_cache_hit_ratio', 'Hits / lookups since start', lambda: {
+        ('synthesis',): synthesis_cache.stats()['hit_ratio'],
+        ('coqui_models',): cache_ratio(dict(coqui_models.stats(), misses=coqui_models.loads))
+    }, ('cache',)
+))
+metrics.register(GaugeFunction(
+    'tts_queue_depth', 'Work waiting or in flight', lambda: {
+        ('jobs',): job_queue_stats()['queue_depth'],
+        ('jobs_running',): job_queue_stats()['running'],
+        ('edge_in_flight',): edge_loop_stats()['in_flight']
+    }, ('queue',)
+))
+metrics.register(GaugeFunction(
+    'tts_circuit_open', '1 while an engine is skipped by its circuit breaker', lambda: {
+        (engine,): int(breaker.stats()['state'] != CircuitBreaker.CLOSED)
+        for engine, breaker in list(engine_breakers.items())
+    }, ('engine',)
+))
+metrics.register(CounterFunction(
+    'tts_hedge_requests_total', 'Hedge-eligible requests by outcome', lambda: {
+        (outcome,): count for outcome, count in hedge_controller.stats().items()
+        if outcome in ('requests', 'hedged', 'primary_wins', 'hedge_wins', 'failed')
+    }, ('outcome',)
+))
+metrics.register(GaugeFunction(
+    'tts_hedge_delay_seconds', 'Current hedge delay per primary engine', lambda: {
+        (engine,): delay for engine, delay in hedge_controller.stats()['delays'].items()
+    }, ('engine',)
+))
+metrics.register(CounterFunction(
+    'tts_synthesis_flight_calls_total', 'Single-flight calls by role', lambda: {
+        (role,): count for role, count in synthesis_flight.stats().items()
+        if role in ('leaders', 'coalesced', 'bypassed', 'errors', 'timeouts', 'retries')
+    }, ('role',)
+))
+metrics.register(GaugeFunction(
+    'tts_synthesis_flight_in_flight', 'Single-flight keys currently synthesizing',
+    lambda: synthesis_flight.stats()['in_flight']
+))
+metrics.register(GaugeFunction(
+    'tts_audio_store_bytes', 'Bytes of generated audio tracked by the janitor',
+    lambda: audio_janitor_stats()['total_bytes']
+))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'status': 'error', 'message': 'Resource not found'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/process-file', methods=['POST'])
 @login_required
 def process_file():
@@ -1520,50 +3914,114 @@ def process_file():
         logger.error(f"Unexpected error in file processing: {str(e)}")
         return jsonify({'status': 'error', 'message': 'An unexpected error occurred'}), 500
 
-@app.route('/api/voice-preview/<voice_id>')
-def voice_preview(voice_id):
-    try:
-        voice = None
-        for lang in VOICES.values():
-            for v in lang:
-                if v.get('id') == voice_id:
-                    voice = v
-                    break
-            if voice:
-                break
+preview_flight = SingleFlight()
 
-        if not voice:
-            return jsonify({'status': 'error', 'message': 'Voice not found'}), 404
+def ensure_voice_preview(voice_id, language, voice):
+    """Return the preview path, synthesizing it once even when many first requests race"""
+    preview_path = os.path.join(VOICE_PREVIEWS, f"{voice_id}_preview.mp3")
+    if os.path.exists(preview_path):
+        return preview_path
 
-        preview_file = f"{voice_id}_preview.mp3"
-        preview_path = os.path.join(VOICE_PREVIEWS, preview_file)
+    def render():
+        if os.path.exists(preview_path):  # Rendered while we were queued behind the lock
+            return preview_path
+
+        sample_text = voice.get('sample_text', 'Hello, this is a sample')
         
-        if not os.path.exists(preview_path):
-            sample_text = voice.get('sample_text', 'Hello, this is a sample')
-            
+        with timing_span('synth'):
             if voice.get('service') == 'polly':
                 audio_data = generate_with_polly(sample_text, voice['id'])
             elif voice.get('service') == 'edge':
                 audio_data = generate_with_edge(sample_text, voice['id'])
             else:
-                lang_code = GTTS_LANG_CODES.get(voice.get('language'), "en")
+                lang_code = GTTS_LANG_CODES.get(language, "en")
                 audio_data = generate_with_gtts(sample_text, lang=lang_code)
-            
-            if not audio_data:
-                raise Exception("All TTS methods failed for preview")
-            
-            with open(preview_path, 'wb') as f:
-                f.write(audio_data)
+        
+        if not audio_data:
+            raise Exception("All TTS methods failed for preview")
+        
+        with timing_span('save'):
+            write_file_atomic(preview_path, audio_data)
+        return preview_path
+
+    return preview_flight.do(voice_id, render)
+
+def prewarm_voice_previews(concurrency):
+    """Render missing previews for every catalog voice with bounded concurrency"""
+    lock_file = None
+    if fcntl:
+        # Every gunicorn worker starts a prewarm; only one process per node does the work
+        lock_file = open(os.path.join(VOICE_PREVIEWS, '.prewarm.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.info("Voice preview prewarm already running in another process")
+            return {'rendered': 0, 'failed': 0, 'skipped': True}
+    try:
+        return render_missing_previews(concurrency)
+    finally:
+        if lock_file:
+            lock_file.close()
+
+def render_missing_previews(concurrency):
+    missing = [
+        (voice_id, language, voice)
+        for voice_id, (language, voice) in VOICE_INDEX.by_id.items()
+        if not os.path.exists(os.path.join(VOICE_PREVIEWS, f"{voice_id}_preview.mp3"))
+    ]
+    rendered = failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='preview-prewarm') as pool:
+        futures = {pool.submit(ensure_voice_preview, *item): item[0] for item in missing}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Preview prewarm failed for {futures[future]}: {str(e)}")
+    logger.info(f"Voice preview prewarm finished: {rendered} rendered, {failed} failed, "
+                f"{len(VOICE_INDEX.by_id) - len(missing)} already present")
+    return {'rendered': rendered, 'failed': failed}
+
+def start_preview_prewarm():
+    thread = threading.Thread(
+        target=prewarm_voice_previews,
+        args=(app.config['PREWARM_CONCURRENCY'],),
+        name='preview-prewarm',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+@app.route('/api/voice-preview/<voice_id>')
+def voice_preview(voice_id):
+    try:
+        with timing_span('lookup'):
+            language, voice = VOICE_INDEX.find_by_id(voice_id)
+
+        if not voice:
+            return jsonify({'status': 'error', 'message': 'Voice not found'}), 404
 
-        return send_from_directory(VOICE_PREVIEWS, preview_file, mimetype="audio/mp3")
+        with timing_span('preview'):
+            preview_path = ensure_voice_preview(voice_id, language, voice)
+        return send_audio(VOICE_PREVIEWS, os.path.basename(preview_path), app.config['PREVIEW_MAX_AGE'])
 
     except Exception as e:
         logger.error(f"Voice preview error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/admin/prewarm-previews', methods=['POST'])
+@admin_required
+def admin_prewarm_previews():
+    """Render missing voice previews in the background"""
+    start_preview_prewarm()
+    return jsonify({'status': 'success', 'message': 'Preview prewarm started'}), 202
+
 @app.route('/api/polly-voices', methods=['GET'])
 def get_polly_voices():
     try:
+        polly_client = get_polly_client()
         if not polly_client:
             return jsonify({'status': 'error', 'message': 'Amazon Polly not configured'}), 500
             
@@ -1576,15 +4034,92 @@ def get_polly_voices():
         logger.error(f"Error fetching Polly voices: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# Audio delivery: range requests, validators and cache headers, optionally offloaded to the proxy
+AUDIO_MIMETYPES = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg'
+}
+
+# Sharded content-hash/UUID names are never reused for different audio, so they are safe to cache forever
+CONTENT_NAMED_AUDIO = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{28}(?:\.\d+k)?\.\w+$')
+
+def send_audio(directory, filename, max_age, immutable=False):
+    """Serve an audio file with Accept-Ranges/206, ETag/Last-Modified and Cache-Control.
+
+    With AUDIO_OFFLOAD=x-accel the body is left to nginx via X-Accel-Redirect; with
+    x-sendfile Flask's USE_X_SENDFILE makes send_file emit X-Sendfile instead of bytes.
+    """
+    mimetype = AUDIO_MIMETYPES.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+
+    if app.config['AUDIO_OFFLOAD'] == 'x-accel':
+        path = safe_join(directory, filename)
+        if not path or not os.path.isfile(path):
+            return jsonify({'status': 'error', 'message': 'Resource not found'}), 404
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{app.config['AUDIO_ACCEL_PREFIX'].rstrip('/')}/{path.replace(os.sep, '/').lstrip('./')}"
+    else:
+        response = send_from_directory(
+            directory,
+            filename,
+            mimetype=mimetype,
+            conditional=True,
+            etag=True,
+            max_age=max_age
+        )
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    cache_control = f"public, max-age={max_age}"
+    if immutable:
+        cache_control += ", immutable"
+    response.headers['Cache-Control'] = cache_control
+    return response
+
 @app.route('/static/audio/<path:filename>')
 def serve_audio(filename):
-    return send_from_directory(AUDIO_FOLDER, filename)
+    immutable = bool(CONTENT_NAMED_AUDIO.match(filename))
+    if immutable:
+        get_audio_janitor().touch(filename)
+    max_age = app.config['AUDIO_MAX_AGE'] if immutable else app.config['PREVIEW_MAX_AGE']
+    return send_audio(AUDIO_FOLDER, filename, max_age, immutable=immutable)
+
+# Kick off Bark model loading without blocking boot (the bark_server process loads its own).
+# Under gunicorn preload the weights must be resident before workers fork, so load inline.
+if app.config['BARK_ENABLED'] and not app.config['BARK_SERVER_ADDRESS']:
+    if app.config['BARK_PRELOAD']:
+        from bark_tts.generate_bark import preload_bark_for_fork
+        preload_bark_for_fork()
+    else:
+        from bark_tts.generate_bark import start_bark_loading
+        start_bark_loading()
+
+mark_startup_phase('routes')
+logger.info("Startup finished in %.1f ms (%s)", startup_report()['total_ms'],
+            ', '.join(f"{name} {duration * 1000:.1f} ms" for name, duration, _ in STARTUP_PHASES))
+
+def start_background_services():
+    """Start work that should not wait for a first request: job workers (resuming journaled
+    jobs) and, if enabled, the preview prewarm. Called by gunicorn's post_worker_init hook."""
+    get_job_queue()
+    if app.config['PREWARM_PREVIEWS']:
+        start_preview_prewarm()
 
 if __name__ == '__main__':
+    if '--profile-startup' in sys.argv:
+        # Report startup phases plus what each deferred dependency would have cost, then exit
+        print(json.dumps(startup_report(import_lazy=True), indent=2))
+        sys.exit(0)
+    if '--download-coqui-models' in sys.argv:
+        # Deploy step: fetch the Coqui fallback models so no request ever downloads one
+        sys.exit(1 if download_coqui_models() else 0)
+
     # Create session directory if it doesn't exist
     if not os.path.exists(app.config['SESSION_FILE_DIR']):
         os.makedirs(app.config['SESSION_FILE_DIR'])
     
+    start_background_services()
+
     #app.run(debug=True)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
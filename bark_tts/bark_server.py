@@ -0,0 +1,287 @@
+"""Local Bark inference worker.
+
+Runs as its own process so the web workers never hold the models or compete for CPU
+with generation. Clients talk to it over a Unix socket (multiprocessing.connection):
+
+    BARK_SERVER_AUTHKEY=<secret> python -m bark_tts.bark_server
+
+multiprocessing.connection unpickles what it receives, so the server refuses to start
+without BARK_SERVER_AUTHKEY and keeps its socket in a private (0700) directory with
+mode 0600. Web workers need the same BARK_SERVER_AUTHKEY in their environment.
+
+Requests are coalesced, not batched: those arriving within BARK_COALESCE_WAIT_MS of each
+other (up to BARK_COALESCE_MAX) form a window in which identical requests (same text,
+voice and temperatures) are generated once and the audio is fanned out to every waiter.
+Bark's public API generates one sequence at a time, so distinct texts are still generated
+one after another; the window only saves work for duplicates.
+"""
+import os
+import stat
+import time
+import queue
+import socket
+import tempfile
+import logging
+import argparse
+import threading
+from contextlib import closing
+from multiprocessing.connection import Listener, Client
+
+from bark_tts.generate_bark import (
+    BarkNotReady, bark_status, generate_long_audio, resolve_profile, start_bark_loading, wait_for_bark
+)
+
+BARK_SERVER_ADDRESS = os.getenv('BARK_SERVER_ADDRESS') or os.path.join(
+    os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f"sky-tts-bark-{os.getuid()}", 'bark_server.sock'
+)
+BARK_SERVER_AUTHKEY = os.getenv('BARK_SERVER_AUTHKEY', '').encode() or None
+BARK_COALESCE_MAX = int(os.getenv('BARK_COALESCE_MAX', 4))
+BARK_COALESCE_WAIT_MS = int(os.getenv('BARK_COALESCE_WAIT_MS', 50))
+BARK_LOAD_TIMEOUT = float(os.getenv('BARK_LOAD_TIMEOUT', 600))  # Queued requests wait this long for models
+
+def require_authkey(authkey):
+    if not authkey:
+        raise RuntimeError("BARK_SERVER_AUTHKEY must be set: the Bark server unpickles client messages")
+    return authkey
+
+def prepare_socket_dir(address):
+    """Create the socket's directory private to this user, refusing one anyone else can reach"""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise RuntimeError(f"{directory} must be owned by this user and not accessible to others (chmod 700)")
+
+def listener_alive(address):
+    """True when something is accepting connections on the socket"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(address)
+        return True
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    finally:
+        probe.close()
+
+class BarkInferenceServer:
+    """Owns the Bark models and serves generate requests from a queue, coalescing duplicates"""
+    def __init__(self, address=BARK_SERVER_ADDRESS, authkey=BARK_SERVER_AUTHKEY,
+                 coalesce_max=BARK_COALESCE_MAX, coalesce_wait_ms=BARK_COALESCE_WAIT_MS, profile=None):
+        self.address = address
+        self.profile = profile
+        self.authkey = require_authkey(authkey)
+        self.coalesce_max = max(1, coalesce_max)
+        self.coalesce_wait = coalesce_wait_ms / 1000.0
+        self._requests = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'started_at': time.time(),
+            'requests': 0,
+            'failed': 0,
+            'windows': 0,
+            'generations': 0,  # Fewer than requests when duplicates were coalesced
+            'audio_seconds': 0.0,
+            'cpu_seconds': 0.0,
+            'busy_seconds': 0.0
+        }
+
+    def serve_forever(self):
+        prepare_socket_dir(self.address)
+        if os.path.exists(self.address):
+            if listener_alive(self.address):
+                raise RuntimeError(f"Another Bark server is already listening on {self.address}")
+            os.remove(self.address)  # Stale socket from a previous run
+
+        old_umask = os.umask(0o177)  # Socket is created 0600, with no window where it is wider
+        try:
+            listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.address, 0o600)
+
+        start_bark_loading(self.profile)
+        threading.Thread(target=self._coalesce_loop, name='bark-coalescer', daemon=True).start()
+
+        with listener:
+            logging.info(f"Bark inference server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:  # Failed authentication or aborted handshake
+                    logging.warning(f"Rejected Bark client: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        with closing(conn):
+            try:
+                while True:
+                    message = conn.recv()
+                    op = message.get('op')
+                    if op == 'status':
+                        conn.send({'ok': True, 'bark': bark_status(), 'stats': self.stats()})
+                    elif op == 'generate':
+                        pending = {
+                            'request': message,
+                            'done': threading.Event(),
+                            'result': None,
+                            'error': None,
+                            'not_ready': False,
+                            'invalid': False
+                        }
+                        self._requests.put(pending)
+                        pending['done'].wait()
+                        conn.send({
+                            'ok': pending['error'] is None,
+                            'audio': pending['result'],
+                            'error': pending['error'],
+                            'not_ready': pending['not_ready'],
+                            'invalid': pending['invalid']
+                        })
+                    else:
+                        conn.send({'ok': False, 'error': f"Unknown op: {op}"})
+            except (EOFError, OSError):
+                pass  # Client closed the connection or gave up waiting
+
+    def _coalesce_loop(self):
+        while True:
+            window = [self._requests.get()]
+            deadline = time.monotonic() + self.coalesce_wait
+            while len(window) < self.coalesce_max:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    window.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_window(window)
+
+    def _run_window(self, window):
+        try:
+            wait_for_bark(BARK_LOAD_TIMEOUT)
+        except BarkNotReady as e:
+            for pending in window:
+                pending.update(error=str(e), not_ready=True)
+                pending['done'].set()
+            return
+
+        # Identical requests in the window are generated once; the rest run one at a time
+        groups = {}
+        for pending in window:
+            request = pending['request']
+            key = (request.get('history_prompt'), request.get('speaker_key'),
+                   request.get('text_temp', 0.7), request.get('waveform_temp', 0.7))
+            groups.setdefault(key, {}).setdefault(request['text'], []).append(pending)
+
+        with self._stats_lock:
+            self._stats['windows'] += 1
+            self._stats['requests'] += len(window)
+
+        for (history_prompt, speaker_key, text_temp, waveform_temp), texts in groups.items():
+            for text, waiters in texts.items():
+                try:
+                    audio = self._generate(text, history_prompt, speaker_key, text_temp, waveform_temp)
+                    for pending in waiters:
+                        pending['result'] = audio
+                except ValueError as e:
+                    for pending in waiters:
+                        pending.update(error=str(e), invalid=True)
+                except Exception as e:
+                    logging.error(f"Bark generation failed: {str(e)}")
+                    with self._stats_lock:
+                        self._stats['failed'] += len(waiters)
+                    for pending in waiters:
+                        pending['error'] = str(e)
+                for pending in waiters:
+                    pending['done'].set()
+
+    def _generate(self, text, history_prompt, speaker_key, text_temp, waveform_temp):
+        cpu_started = time.process_time()
+        wall_started = time.monotonic()
+        sample_rate, audio_array = generate_long_audio(
+            text,
+            history_prompt=history_prompt,
+            speaker_key=speaker_key,
+            text_temp=text_temp,
+            waveform_temp=waveform_temp
+        )
+
+        with self._stats_lock:
+            self._stats['generations'] += 1
+            self._stats['audio_seconds'] += len(audio_array) / sample_rate
+            self._stats['cpu_seconds'] += time.process_time() - cpu_started
+            self._stats['busy_seconds'] += time.monotonic() - wall_started
+        return sample_rate, audio_array
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        uptime = time.time() - stats['started_at']
+        stats['queue_depth'] = self._requests.qsize()
+        stats['coalesce_max'] = self.coalesce_max
+        stats['coalesce_wait_ms'] = int(self.coalesce_wait * 1000)
+        stats['requests_per_minute'] = round(stats['requests'] * 60 / uptime, 2) if uptime else 0.0
+        stats['avg_window_size'] = round(stats['requests'] / stats['windows'], 2) if stats['windows'] else 0.0
+        stats['audio_seconds_per_cpu_second'] = (
+            round(stats['audio_seconds'] / stats['cpu_seconds'], 4) if stats['cpu_seconds'] else 0.0
+        )
+        return stats
+
+
+class BarkClient:
+    """Talks to a BarkInferenceServer; one short-lived connection per call"""
+    def __init__(self, address=BARK_SERVER_ADDRESS, authkey=BARK_SERVER_AUTHKEY):
+        self.address = address
+        self.authkey = require_authkey(authkey)
+
+    def _call(self, message, timeout):
+        with closing(Client(self.address, family='AF_UNIX', authkey=self.authkey)) as conn:
+            conn.send(message)
+            if not conn.poll(timeout):
+                raise TimeoutError(f"Bark server did not answer within {timeout}s")
+            return conn.recv()
+
+    def generate(self, text, history_prompt=None, speaker_key=None, text_temp=0.7, waveform_temp=0.7, timeout=300):
+        """Return (sample_rate, int16 numpy array) for text"""
+        reply = self._call({
+            'op': 'generate',
+            'text': text,
+            'history_prompt': history_prompt,
+            'speaker_key': speaker_key,
+            'text_temp': text_temp,
+            'waveform_temp': waveform_temp
+        }, timeout)
+        if reply.get('not_ready'):
+            raise BarkNotReady(reply['error'])
+        if reply.get('invalid'):
+            raise ValueError(reply['error'])
+        if not reply['ok']:
+            raise Exception(f"Bark server error: {reply['error']}")
+        return reply['audio']
+
+    def status(self, timeout=5):
+        return self._call({'op': 'status'}, timeout)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description="Local Bark inference server")
+    parser.add_argument('--address', default=BARK_SERVER_ADDRESS)
+    parser.add_argument('--coalesce-max', type=int, default=BARK_COALESCE_MAX)
+    parser.add_argument('--coalesce-wait-ms', type=int, default=BARK_COALESCE_WAIT_MS)
+    parser.add_argument('--profile', default=None, help="CPU profile from BARK_PROFILES (default: BARK_PROFILE)")
+    parser.add_argument('--threads', type=int, default=int(os.getenv('BARK_SERVER_THREADS', 0)),
+                        help="torch intra-op threads, overrides the profile (0 = profile setting)")
+    args = parser.parse_args()
+
+    profile = resolve_profile(args.profile)
+    if args.threads:
+        profile['num_threads'] = args.threads
+
+    BarkInferenceServer(
+        args.address,
+        coalesce_max=args.coalesce_max,
+        coalesce_wait_ms=args.coalesce_wait_ms,
+        profile=profile
+    ).serve_forever()
@@ -0,0 +1,71 @@
+"""Benchmark Bark CPU profiles: seconds of audio produced per CPU-second.
+
+    python -m bark_tts.benchmark_bark --profiles quality balanced fast --runs 2
+
+Each profile is loaded fresh, then the sample texts are generated with a fixed seed.
+torch only allows the inter-op thread count to be set once per process, so for exact
+per-profile interop numbers run one profile per invocation.
+"""
+import time
+import logging
+import argparse
+import numpy as np
+
+from bark_tts.generate_bark import BARK_PROFILES, initialize_bark, resolve_profile
+
+SAMPLE_TEXTS = [
+    "Hello! Welcome to Sky TTS, your text to speech studio.",
+    "नमस्ते, आज का मौसम बहुत सुहावना है।",
+    "The quick brown fox jumps over the lazy dog, then takes a well deserved nap."
+]
+
+def benchmark_profile(name, runs=1, seed=1234):
+    import torch
+    from bark import SAMPLE_RATE, generate_audio
+    from bark.generation import clean_models
+
+    clean_models()
+    load_started = time.monotonic()
+    profile = initialize_bark(resolve_profile(name))
+    load_seconds = time.monotonic() - load_started
+
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    audio_seconds = cpu_seconds = wall_seconds = 0.0
+    for _ in range(runs):
+        for text in SAMPLE_TEXTS:
+            cpu_started = time.process_time()
+            wall_started = time.monotonic()
+            with torch.inference_mode():
+                audio_array = generate_audio(text, silent=True)
+            cpu_seconds += time.process_time() - cpu_started
+            wall_seconds += time.monotonic() - wall_started
+            audio_seconds += len(audio_array) / SAMPLE_RATE
+
+    return {
+        'profile': name,
+        'threads': torch.get_num_threads(),
+        'interop_threads': torch.get_num_interop_threads(),
+        'quantize': profile['quantize'],
+        'load_seconds': round(load_seconds, 1),
+        'audio_seconds': round(audio_seconds, 1),
+        'cpu_seconds': round(cpu_seconds, 1),
+        'wall_seconds': round(wall_seconds, 1),
+        'audio_per_cpu_second': round(audio_seconds / cpu_seconds, 4) if cpu_seconds else 0.0,
+        'realtime_factor': round(audio_seconds / wall_seconds, 4) if wall_seconds else 0.0
+    }
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark Bark CPU profiles")
+    parser.add_argument('--profiles', nargs='+', default=list(BARK_PROFILES), choices=list(BARK_PROFILES))
+    parser.add_argument('--runs', type=int, default=1, help="Passes over the sample texts per profile")
+    args = parser.parse_args()
+
+    columns = ['profile', 'threads', 'interop_threads', 'quantize', 'load_seconds',
+               'audio_seconds', 'cpu_seconds', 'wall_seconds', 'audio_per_cpu_second', 'realtime_factor']
+    print('\t'.join(columns))
+    for name in args.profiles:
+        result = benchmark_profile(name, args.runs)
+        print('\t'.join(str(result[c]) for c in columns))
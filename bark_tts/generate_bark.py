@@ -1,55 +1,412 @@
 import os
-import torch
+import re
+import gc
 import logging
-import warnings
-from functools import wraps
-from bark import SAMPLE_RATE, generate_audio, preload_models
-from scipy.io.wavfile import write as write_wav
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 # Configure cache location
 BARK_CACHE_DIR = os.path.expanduser("~/.cache/suno/bark_v0")
 os.makedirs(BARK_CACHE_DIR, exist_ok=True)
 
-def initialize_bark():
-    """Initialize Bark models with proper weights handling"""
+# Long-form generation: Bark produces ~13 seconds per call, so longer text is split into segments
+BARK_SEGMENT_WORDS = int(os.getenv('BARK_SEGMENT_WORDS', 28))
+BARK_SEGMENT_SILENCE = float(os.getenv('BARK_SEGMENT_SILENCE', 0.25))  # Seconds of silence between segments
+BARK_PROMPT_CACHE_SIZE = int(os.getenv('BARK_PROMPT_CACHE_SIZE', 8))  # Generated speaker prompts kept in memory
+BARK_MAX_CHARS = int(os.getenv('BARK_MAX_CHARS', 5000))  # Longest text one call may generate
+
+# Memory-map checkpoints so weights live in shared page cache instead of per-process copies
+BARK_MMAP_WEIGHTS = os.getenv('BARK_MMAP_WEIGHTS', 'true').lower() == 'true'
+
+# CPU performance profiles: sub-model sizes, torch threading and dynamic int8 quantization.
+# num_threads/interop_threads of 0 keep torch's defaults. Quantization builds private copies of
+# the weights, so 'fast' cannot share memory-mapped weights between workers; with it, only a
+# gunicorn preload parent (BARK_PRELOAD) shares them, copy-on-write.
+BARK_PROFILES = {
+    'quality': {
+        'text_use_small': False, 'coarse_use_small': False, 'fine_use_small': False,
+        'num_threads': 0, 'interop_threads': 0, 'quantize': False
+    },
+    'balanced': {
+        'text_use_small': True, 'coarse_use_small': False, 'fine_use_small': False,
+        'num_threads': 0, 'interop_threads': 1, 'quantize': False
+    },
+    'fast': {
+        'text_use_small': True, 'coarse_use_small': True, 'fine_use_small': True,
+        'num_threads': 0, 'interop_threads': 1, 'quantize': True
+    }
+}
+BARK_PROFILE = os.getenv('BARK_PROFILE', 'quality')
+
+def resolve_profile(name=None):
+    """Return the named profile with BARK_NUM_THREADS/BARK_INTEROP_THREADS/BARK_QUANTIZE overrides applied"""
+    name = name or BARK_PROFILE
+    if name not in BARK_PROFILES:
+        raise ValueError(f"Unknown Bark profile '{name}', expected one of {', '.join(BARK_PROFILES)}")
+    profile = dict(BARK_PROFILES[name], name=name)
+    if os.getenv('BARK_NUM_THREADS'):
+        profile['num_threads'] = int(os.getenv('BARK_NUM_THREADS'))
+    if os.getenv('BARK_INTEROP_THREADS'):
+        profile['interop_threads'] = int(os.getenv('BARK_INTEROP_THREADS'))
+    if os.getenv('BARK_QUANTIZE'):
+        profile['quantize'] = os.getenv('BARK_QUANTIZE').lower() == 'true'
+    return profile
+
+def apply_thread_settings(profile):
+    import torch
+    if profile['num_threads']:
+        torch.set_num_threads(profile['num_threads'])
+    if profile['interop_threads']:
+        try:
+            torch.set_num_interop_threads(profile['interop_threads'])
+        except RuntimeError:
+            # Only settable once, before any inter-op parallel work has started
+            logging.warning("Bark interop threads already fixed for this process; keeping current setting")
+
+def quantize_bark_models():
+    """Swap the loaded GPT sub-models for dynamically int8-quantized copies of their Linear layers.
+
+    quantize_dynamic deep-copies each model, so the result lives in this process's private
+    memory rather than in the shared checkpoint mapping.
+    """
+    import torch
+    from bark import generation
+
+    for key in ('text', 'coarse', 'fine'):
+        container = generation.models.get(key)
+        if container is None:
+            continue
+        if isinstance(container, dict):  # The text model is stored alongside its tokenizer
+            container['model'] = torch.quantization.quantize_dynamic(container['model'], {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            generation.models[key] = torch.quantization.quantize_dynamic(container, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_mmapped_model(model_type, use_small):
+    """Load one Bark GPT sub-model with its weights memory-mapped from the checkpoint.
+
+    Mirrors bark.generation._load_model, but passes mmap=True to torch.load and assign=True to
+    load_state_dict so parameters stay backed by the read-only file mapping that every process
+    on the node shares. Returns None when the checkpoint is not downloaded yet.
+    """
+    import torch
+    from bark import generation
+    from bark.model import GPT, GPTConfig
+    from bark.model_fine import FineGPT, FineGPTConfig
+
+    ckpt_path = generation._get_ckpt_path(model_type, use_small=use_small)
+    if not os.path.exists(ckpt_path):
+        return None
+    checkpoint = torch.load(ckpt_path, map_location='cpu', mmap=True)
+    model_args = checkpoint['model_args']
+    if 'input_vocab_size' not in model_args:
+        model_args['input_vocab_size'] = model_args['output_vocab_size'] = model_args.pop('vocab_size')
+    config_class, model_class = (FineGPTConfig, FineGPT) if model_type == 'fine' else (GPTConfig, GPT)
+    model = model_class(config_class(**model_args))
+
+    prefix = '_orig_mod.'
+    state_dict = {key[len(prefix):] if key.startswith(prefix) else key: value
+                  for key, value in checkpoint['model'].items()}
+    own = model.state_dict()
+    # Same checks as Bark's loader: only the causal-mask buffers (.attn.bias) may differ
+    extra_keys = {key for key in state_dict.keys() - own.keys() if not key.endswith('.attn.bias')}
+    missing_keys = {key for key in own.keys() - state_dict.keys() if not key.endswith('.attn.bias')}
+    if extra_keys or missing_keys:
+        raise RuntimeError(f"Bark {model_type} checkpoint {ckpt_path} does not match the model: "
+                           f"missing {sorted(missing_keys)}, unexpected {sorted(extra_keys)}")
+    # Assigning would silently change dtype/shape, so only adopt exact matches
+    adoptable = all(
+        key not in own or (own[key].dtype == value.dtype and own[key].shape == value.shape)
+        for key, value in state_dict.items()
+    )
+    model.load_state_dict(state_dict, strict=False, assign=adoptable)
+    model.eval()
+
+    if model_type == 'text':
+        from transformers import BertTokenizer
+        return {'model': model, 'tokenizer': BertTokenizer.from_pretrained('bert-base-multilingual-cased')}
+    return model
+
+def preload_mmapped_models(profile):
+    """Put memory-mapped GPT sub-models in Bark's model cache so preload_models reuses them;
+    checkpoints not downloaded yet are left to Bark's own loader"""
+    from bark import generation
+    for model_type in ('text', 'coarse', 'fine'):
+        if model_type not in generation.models:
+            model = load_mmapped_model(model_type, profile[f'{model_type}_use_small'])
+            if model is not None:
+                generation.models[model_type] = model
+
+def process_memory(pid='self'):
+    """RSS/PSS breakdown in MB from /proc/<pid>/smaps_rollup (Linux only)"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': round(fields.get('Rss', 0), 1),
+        'pss_mb': round(fields.get('Pss', 0), 1),
+        'shared_mb': round(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0), 1),
+        'private_mb': round(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0), 1)
+    }
+
+def check_memory_budget(max_private_mb):
+    """Compare this worker's private (unshared) memory against a budget"""
     try:
-        # Create a context manager for safe loading
-        from torch.serialization import safe_globals
-        with safe_globals([np.core.multiarray.scalar]):
-            # Check for existing models
-            required_files = ["text_2.pt", "coarse_2.pt", "fine_2.pt", "encodec_model.pt"]
-            models_exist = all(os.path.exists(os.path.join(BARK_CACHE_DIR, f)) for f in required_files)
-            
-            if models_exist:
-                logging.info("Using cached Bark models")
-            else:
-                logging.info("Downloading Bark models (first time may take several minutes)...")
-            
-            preload_models(
-                text_use_gpu=False,
-                text_use_small=False,
-                coarse_use_gpu=False,
-                fine_use_gpu=False,
-                codec_use_gpu=False
-            )
-        return True
+        memory = process_memory()
+    except OSError:
+        return {'supported': False}
+    memory['budget_mb'] = max_private_mb
+    memory['within_budget'] = memory['private_mb'] <= max_private_mb
+    if not memory['within_budget']:
+        logging.warning(f"Worker private memory {memory['private_mb']} MB exceeds budget {max_private_mb} MB")
+    return memory
+
+# Model loading runs in a background thread; callers check or wait on this state
+BARK_STATE = {
+    'status': 'idle',  # idle -> loading -> ready | failed
+    'profile': None,
+    'error': None,
+    'started_at': None,
+    'ready_at': None
+}
+_state_lock = threading.Lock()
+_load_finished = threading.Event()
+
+class BarkNotReady(Exception):
+    """Raised when Bark models are still loading or failed to load"""
+
+def initialize_bark(profile=None):
+    """Initialize Bark models with proper weights handling, tuned by a CPU profile"""
+    # Heavy imports stay out of module import time
+    from bark import preload_models
+    from torch.serialization import safe_globals
+
+    profile = profile if isinstance(profile, dict) else resolve_profile(profile)
+    apply_thread_settings(profile)
+
+    # Create a context manager for safe loading
+    with safe_globals([np.core.multiarray.scalar]):
+        # Check for existing models
+        required_files = [
+            "text.pt" if profile['text_use_small'] else "text_2.pt",
+            "coarse.pt" if profile['coarse_use_small'] else "coarse_2.pt",
+            "fine.pt" if profile['fine_use_small'] else "fine_2.pt",
+            "encodec_model.pt"
+        ]
+        models_exist = all(os.path.exists(os.path.join(BARK_CACHE_DIR, f)) for f in required_files)
+
+        if models_exist:
+            logging.info("Using cached Bark models")
+        else:
+            logging.info("Downloading Bark models (first time may take several minutes)...")
+
+        if BARK_MMAP_WEIGHTS and profile['quantize']:
+            logging.info("Bark weights are quantized into private copies; skipping memory-mapped loading")
+        elif BARK_MMAP_WEIGHTS:
+            preload_mmapped_models(profile)
+        preload_models(
+            text_use_gpu=False,
+            text_use_small=profile['text_use_small'],
+            coarse_use_gpu=False,
+            coarse_use_small=profile['coarse_use_small'],
+            fine_use_gpu=False,
+            fine_use_small=profile['fine_use_small'],
+            codec_use_gpu=False
+        )
+
+    if profile['quantize']:
+        quantize_bark_models()
+    return profile
+
+def _load_models(profile):
+    try:
+        profile = initialize_bark(profile)
+        with _state_lock:
+            BARK_STATE.update(status='ready', profile=profile['name'], ready_at=time.time())
+        logging.info(f"Bark models ready after {BARK_STATE['ready_at'] - BARK_STATE['started_at']:.1f}s")
     except Exception as e:
         logging.error(f"Bark initialization failed: {str(e)}")
-        return False
+        with _state_lock:
+            BARK_STATE.update(status='failed', error=str(e))
+    finally:
+        _load_finished.set()
+
+def start_bark_loading(profile=None, background=True):
+    """Start loading models in a daemon thread; no-op if already loading or loaded"""
+    with _state_lock:
+        if BARK_STATE['status'] not in ('idle', 'failed'):
+            return False
+        BARK_STATE.update(status='loading', error=None, started_at=time.time(), ready_at=None)
+        _load_finished.clear()
+    if background:
+        threading.Thread(target=_load_models, args=(profile,), name='bark-loader', daemon=True).start()
+    else:
+        _load_models(profile)
+    return True
+
+def preload_bark_for_fork(profile=None):
+    """Load models synchronously in a pre-fork parent (gunicorn preload_app) for copy-on-write sharing.
+
+    gc.freeze() moves everything allocated so far out of the collector's reach, so collections
+    in the workers don't write to (and un-share) the pages holding the model objects.
+    """
+    start_bark_loading(profile, background=False)
+    gc.collect()
+    gc.freeze()
+    return bark_status()
+
+def bark_status():
+    with _state_lock:
+        return dict(BARK_STATE)
+
+def is_bark_ready():
+    return BARK_STATE['status'] == 'ready'
+
+def wait_for_bark(timeout=0):
+    """Block up to timeout seconds for the models; raise BarkNotReady if they are not usable"""
+    if BARK_STATE['status'] == 'idle':
+        start_bark_loading()
+    if timeout:
+        _load_finished.wait(timeout)
+    state = bark_status()
+    if state['status'] == 'failed':
+        raise BarkNotReady(f"Bark models failed to load: {state['error']}")
+    if state['status'] != 'ready':
+        raise BarkNotReady("Bark models are still loading")
+
+def write_bark_wav(output_path, sample_rate, audio_array):
+    from scipy.io.wavfile import write as write_wav
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    partial_path = f"{output_path}.part"
+    try:
+        write_wav(partial_path, sample_rate, audio_array)
+        os.replace(partial_path, output_path)  # Readers never see a half-written file
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return output_path
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?؟])\s+|(?<=[।॥。！？])\s*|\n+')
+
+def split_bark_segments(text, max_words=BARK_SEGMENT_WORDS):
+    """Pack whole sentences into segments of at most max_words; split longer sentences on words"""
+    segments = []
+    current = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+        if not words:
+            continue
+        if current and len(current) + len(words) > max_words:
+            segments.append(' '.join(current))
+            current = []
+        while len(words) > max_words:
+            segments.append(' '.join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        segments.append(' '.join(current))
+    return segments
+
+def validate_history_prompt(history_prompt):
+    """Accept only Bark's built-in presets; Bark np.load()s any other string ending in .npz"""
+    if history_prompt is None:
+        return None
+    if not isinstance(history_prompt, str):
+        raise ValueError("voice_preset must be a string")
+    from bark.generation import ALLOWED_PROMPTS
+    if history_prompt not in ALLOWED_PROMPTS:
+        raise ValueError(f"Unknown voice_preset: {history_prompt}")
+    return history_prompt
+
+# Speaker prompts produced by the warm-up segment, keyed by the caller's speaker_key
+_speaker_prompts = OrderedDict()
+_speaker_prompts_lock = threading.Lock()
+
+def _get_speaker_prompt(key):
+    with _speaker_prompts_lock:
+        prompt = _speaker_prompts.get(key)
+        if prompt is not None:
+            _speaker_prompts.move_to_end(key)
+        return prompt
+
+def _put_speaker_prompt(key, prompt):
+    with _speaker_prompts_lock:
+        _speaker_prompts[key] = prompt
+        _speaker_prompts.move_to_end(key)
+        while len(_speaker_prompts) > BARK_PROMPT_CACHE_SIZE:
+            _speaker_prompts.popitem(last=False)
+
+def generate_long_audio(text, history_prompt=None, speaker_key=None, text_temp=0.7, waveform_temp=0.7):
+    """Generate text of any length as one int16 array with a consistent voice.
+
+    A preset history_prompt is used for every segment. Otherwise the first segment is generated
+    in full and its output becomes the prompt for the rest (cached under speaker_key for later
+    calls). Remaining segments are pipelined: the semantic pass of segment i+1 runs while segment
+    i is being turned into a waveform.
+    """
+    import torch
+    from bark import SAMPLE_RATE, generate_audio
+    from bark.api import semantic_to_waveform, text_to_semantic
+
+    validate_history_prompt(history_prompt)
+    if len(text) > BARK_MAX_CHARS:
+        raise ValueError(f"Text exceeds {BARK_MAX_CHARS} characters")
+    segments = split_bark_segments(text)
+    if not segments:
+        raise ValueError("No text to synthesize")
+
+    pieces = []
+    prompt = history_prompt
+    if prompt is None and speaker_key:
+        prompt = _get_speaker_prompt(speaker_key)
+
+    with torch.inference_mode():
+        if prompt is None:
+            full_generation, audio = generate_audio(
+                segments[0], text_temp=text_temp, waveform_temp=waveform_temp, silent=True, output_full=True
+            )
+            prompt = full_generation
+            if speaker_key:
+                _put_speaker_prompt(speaker_key, full_generation)
+            pieces.append(audio)
+            segments = segments[1:]
+
+    def semantic_stage(segment):
+        with torch.inference_mode():  # Thread-local, so enter it in the worker thread too
+            return text_to_semantic(segment, history_prompt=prompt, temp=text_temp, silent=True)
+
+    if segments:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='bark-semantic') as semantic_pool, torch.inference_mode():
+            next_semantic = semantic_pool.submit(semantic_stage, segments[0])
+            for i in range(len(segments)):
+                semantic_tokens = next_semantic.result()
+                if i + 1 < len(segments):
+                    next_semantic = semantic_pool.submit(semantic_stage, segments[i + 1])
+                pieces.append(semantic_to_waveform(
+                    semantic_tokens, history_prompt=prompt, temp=waveform_temp, silent=True
+                ))
+
+    silence = np.zeros(int(BARK_SEGMENT_SILENCE * SAMPLE_RATE), dtype=np.float32)
+    joined = []
+    for i, piece in enumerate(pieces):
+        if i:
+            joined.append(silence)
+        joined.append(piece)
+    audio_array = np.concatenate(joined)
+    return SAMPLE_RATE, (np.clip(audio_array, -1.0, 1.0) * 32767).astype(np.int16)
 
-# Initialize on import
-BARK_INITIALIZED = initialize_bark()
+def generate_bark_tts(text, output_path="tts_output.wav", wait_timeout=0, history_prompt=None, speaker_key=None):
+    wait_for_bark(wait_timeout)
 
-def generate_bark_tts(text, output_path="tts_output.wav"):
-    if not BARK_INITIALIZED:
-        raise Exception("Bark models not initialized - check logs for details")
-    
     try:
-        audio_array = generate_audio(text)
-        audio_array = (audio_array * 32767).astype(np.int16)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        write_wav(output_path, SAMPLE_RATE, audio_array)
-        return output_path
+        sample_rate, audio_array = generate_long_audio(text, history_prompt=history_prompt, speaker_key=speaker_key)
+        return write_bark_wav(output_path, sample_rate, audio_array)
+    except ValueError:
+        raise  # Invalid input, reported to the caller as such
     except Exception as e:
-        raise Exception(f"Bark TTS generation failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Bark TTS generation failed: {str(e)}")
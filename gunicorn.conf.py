@@ -0,0 +1,24 @@
+import os
+
+# Gunicorn settings. With in-process Bark enabled the app is imported once in the master
+# (preload_app) so the model weights are loaded before forking and shared copy-on-write by
+# every worker instead of being loaded again per worker.
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+preload_app = (
+    os.getenv('BARK_ENABLED', 'false').lower() == 'true'
+    and not os.getenv('BARK_SERVER_ADDRESS')
+)
+if preload_app:
+    os.environ.setdefault('BARK_PRELOAD', 'true')
+
+wsgi_app = 'app:app'
+
+def post_worker_init(worker):
+    # Resume journaled TTS jobs and start the preview prewarm as soon as each worker is up,
+    # instead of on the first request that happens to touch them
+    from app import start_background_services
+    start_background_services()
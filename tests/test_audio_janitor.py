@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+HOUR = 3600
+
+def make_janitor(root):
+    # No retention or quota at construction, so no background sweeper thread starts
+    janitor = app.AudioJanitor(str(root), 0, 0, interval=HOUR, rescan_interval=HOUR, touch_interval=60)
+    janitor.retention = HOUR
+    return janitor
+
+def write_audio(root, filename, age):
+    path = root / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'audio')
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+def test_sweeper_keeps_files_another_worker_served(tmp_path):
+    served = write_audio(tmp_path, 'ab/cd/served.mp3', 2 * HOUR)
+    idle = write_audio(tmp_path, 'ab/cd/idle.mp3', 2 * HOUR)
+    sweeper, other_worker = make_janitor(tmp_path), make_janitor(tmp_path)
+
+    other_worker.touch('ab/cd/served.mp3')
+    sweeper.sweep()
+
+    assert served.exists()
+    assert not idle.exists()
+    assert sweeper.stats()['expired'] == 1
+
+def test_touch_after_the_last_scan_still_counts(tmp_path):
+    served = write_audio(tmp_path, 'ab/cd/served.mp3', 2 * HOUR)
+    sweeper, other_worker = make_janitor(tmp_path), make_janitor(tmp_path)
+    sweeper._scan()  # Indexed with the old access time; no rescan before the next sweep
+
+    other_worker.touch('ab/cd/served.mp3')
+    sweeper.sweep()
+
+    assert served.exists()
+    assert sweeper.stats()['files'] == 1
+
+def test_touch_bumps_mtime_at_most_once_per_interval(tmp_path):
+    served = write_audio(tmp_path, 'ab/cd/served.mp3', 30)
+    janitor = make_janitor(tmp_path)
+    before = served.stat().st_mtime
+
+    janitor.touch('ab/cd/served.mp3')
+    assert served.stat().st_mtime == before  # Touched within the interval
+
+    old = time.time() - 120
+    os.utime(served, (old, old))
+    janitor.touch('ab/cd/served.mp3')
+    assert served.stat().st_mtime > time.time() - 5
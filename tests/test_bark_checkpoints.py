@@ -0,0 +1,46 @@
+"""Memory-mapped Bark loading must reject checkpoints that don't match the model, like Bark's own
+loader does. Uses a tiny randomly initialized GPT, so no downloaded checkpoints are needed."""
+import pytest
+
+pytest.importorskip('numpy')
+torch = pytest.importorskip('torch')
+generation = pytest.importorskip('bark.generation')
+
+from bark_tts.generate_bark import load_mmapped_model  # noqa: E402
+
+MODEL_ARGS = {'block_size': 16, 'input_vocab_size': 32, 'output_vocab_size': 32,
+              'n_layer': 1, 'n_head': 2, 'n_embd': 8, 'dropout': 0.0, 'bias': False}
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    from bark.model import GPT, GPTConfig
+    path = tmp_path / 'coarse.pt'
+    monkeypatch.setattr(generation, '_get_ckpt_path', lambda model_type, use_small=False: str(path))
+    state_dict = GPT(GPTConfig(**MODEL_ARGS)).state_dict()
+
+    def save(state):
+        torch.save({'model_args': dict(MODEL_ARGS), 'model': state}, path)
+    return state_dict, save
+
+def test_complete_checkpoint_loads(checkpoint):
+    state_dict, save = checkpoint
+    save(state_dict)
+
+    model = load_mmapped_model('coarse', use_small=True)
+    for key, value in model.state_dict().items():
+        assert torch.equal(value, state_dict[key])
+
+def test_truncated_checkpoint_is_rejected(checkpoint):
+    state_dict, save = checkpoint
+    missing = next(key for key in state_dict if not key.endswith('.attn.bias'))
+    save({key: value for key, value in state_dict.items() if key != missing})
+
+    with pytest.raises(RuntimeError, match='does not match'):
+        load_mmapped_model('coarse', use_small=True)
+
+def test_unexpected_keys_are_rejected(checkpoint):
+    state_dict, save = checkpoint
+    save(dict(state_dict, **{'transformer.extra.weight': torch.zeros(1)}))
+
+    with pytest.raises(RuntimeError, match='unexpected'):
+        load_mmapped_model('coarse', use_small=True)
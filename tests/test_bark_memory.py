@@ -0,0 +1,67 @@
+"""Bark workers must share model weights: each extra worker's private memory stays within
+BARK_WORKER_PRIVATE_MB. Needs torch, bark and the downloaded checkpoints; skipped otherwise."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('torch')
+pytest.importorskip('bark')
+
+from bark_tts.generate_bark import BARK_CACHE_DIR, resolve_profile  # noqa: E402
+
+BUDGET_MB = int(os.getenv('BARK_WORKER_PRIVATE_MB', 1024))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loads Bark, reports readiness, then measures once every worker has loaded
+WORKER = """
+import json, sys
+from bark_tts.generate_bark import initialize_bark, process_memory
+initialize_bark('balanced')
+print('ready', flush=True)
+sys.stdin.readline()
+print(json.dumps(process_memory()), flush=True)
+"""
+
+def checkpoints_present():
+    profile = resolve_profile('balanced')
+    files = [
+        "text.pt" if profile['text_use_small'] else "text_2.pt",
+        "coarse.pt" if profile['coarse_use_small'] else "coarse_2.pt",
+        "fine.pt" if profile['fine_use_small'] else "fine_2.pt",
+        "encodec_model.pt"
+    ]
+    return all(os.path.exists(os.path.join(BARK_CACHE_DIR, f)) for f in files)
+
+pytestmark = [
+    pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason='needs Linux smaps_rollup'),
+    pytest.mark.skipif(not checkpoints_present(), reason='Bark checkpoints not downloaded')
+]
+
+def test_workers_share_bark_weights():
+    env = dict(os.environ, BARK_MMAP_WEIGHTS='true', BARK_QUANTIZE='false')
+    workers = [
+        subprocess.Popen([sys.executable, '-c', WORKER], cwd=ROOT, env=env, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for _ in range(2)
+    ]
+    try:
+        for worker in workers:
+            assert worker.stdout.readline().strip() == 'ready'
+        memory = []
+        for worker in workers:
+            worker.stdin.write('\n')
+            worker.stdin.flush()
+            memory.append(json.loads(worker.stdout.readline()))
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+
+    for usage in memory:
+        assert usage['private_mb'] <= BUDGET_MB, usage
+        # Weights mapped by both workers are split between them in PSS
+        assert usage['pss_mb'] < usage['rss_mb'] * 0.75, usage
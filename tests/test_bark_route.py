@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('numpy')
+app = pytest.importorskip('app')
+
+SHORT_TEXT = 'Hello there.'
+LONG_TEXT = ' '.join(['This sentence has exactly eight words in it.'] * 20)
+
+class FakeJobQueue:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, params):
+        self.submitted.append(params)
+        return {'id': 'job1', 'status': 'queued', 'progress': 0, 'created_at': 0, 'updated_at': 0}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(app.app.config, 'BARK_ENABLED', True)
+    monkeypatch.setitem(app.app.config, 'BARK_SERVER_ADDRESS', '')
+    monkeypatch.setitem(app.app.config, 'WTF_CSRF_ENABLED', False)
+    job_queue = FakeJobQueue()
+    monkeypatch.setattr(app, 'get_job_queue', lambda: job_queue)
+    generated = []
+
+    def perform_bark(text, history_prompt=None, speaker_key=None, progress=None, wait_timeout=None):
+        generated.append(text)
+        return {'status': 'success', 'audio_url': '/static/audio/bark.wav'}
+    monkeypatch.setattr(app, 'perform_bark', perform_bark)
+    return app.app.test_client(), job_queue, generated
+
+def test_short_text_is_generated_in_the_request(client):
+    test_client, job_queue, generated = client
+    response = test_client.post('/api/bark_tts', json={'text': SHORT_TEXT})
+
+    assert response.status_code == 200
+    assert response.get_json()['audio_url'] == '/static/audio/bark.wav'
+    assert generated == [SHORT_TEXT] and job_queue.submitted == []
+
+def test_long_text_is_queued_as_a_job(client):
+    test_client, job_queue, generated = client
+    response = test_client.post('/api/bark_tts', json={'text': LONG_TEXT})
+
+    assert response.status_code == 202
+    assert response.get_json()['job']['status_url'].endswith('/job1')
+    assert generated == []
+    assert job_queue.submitted == [{'engine': 'bark', 'text': LONG_TEXT, 'history_prompt': None, 'speaker_key': None}]
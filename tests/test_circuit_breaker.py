@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+CircuitBreaker = app.CircuitBreaker
+
+def make_breaker(cooldown=60):
+    return CircuitBreaker('test', window=60, min_calls=4, error_rate=0.5, cooldown=cooldown)
+
+def test_opens_once_failure_rate_crosses_threshold():
+    breaker = make_breaker()
+    for ok in (True, False, True):
+        breaker.record(ok)
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED  # Below min_calls
+
+    breaker.record(False)
+    assert breaker.stats()['state'] == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = make_breaker(cooldown=0.05)
+    for _ in range(4):
+        breaker.record(False)
+    time.sleep(0.06)
+
+    assert breaker.allow()  # The single trial
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.stats()['state'] == CircuitBreaker.OPEN
+    assert breaker.stats()['times_opened'] == 2
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_no_verdict_frees_the_half_open_trial():
+    breaker = make_breaker(cooldown=0.05)
+    for _ in range(4):
+        breaker.record(False)
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()  # Another trial may run
+
+def test_caller_deadline_is_not_an_engine_failure():
+    calls = []
+
+    @app.with_circuit_breaker('test-deadline-engine')
+    def engine(text, timeout=None):
+        calls.append(text)
+        time.sleep(timeout)
+        return None
+
+    for _ in range(app.app.config['BREAKER_MIN_CALLS'] + 1):
+        assert engine('hello', timeout=0.01) is None
+
+    breaker = app.get_breaker('test-deadline-engine')
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
+    assert breaker.stats()['window_failures'] == 0
+    assert len(calls) == app.app.config['BREAKER_MIN_CALLS'] + 1
+
+def test_keyed_breakers_are_independent():
+    @app.with_circuit_breaker('test-keyed-engine', 'model')
+    def engine(text, model):
+        return b'audio' if model == 'good' else None
+
+    for _ in range(app.app.config['BREAKER_MIN_CALLS']):
+        engine('hello', 'bad')
+
+    assert app.get_breaker('test-keyed-engine:bad').is_open()
+    assert not app.get_breaker('test-keyed-engine:good').is_open()
+    assert engine('hello', 'good') == b'audio'
+
+def test_polly_call_is_bounded_by_the_caller_budget(monkeypatch):
+    pytest.importorskip('botocore')
+    release = threading.Event()
+
+    class SlowPolly:
+        def synthesize_speech(self, **request):
+            release.wait(5)
+            raise AssertionError('should have been abandoned')
+    monkeypatch.setattr(app, 'get_polly_client', lambda: SlowPolly())
+
+    started = time.monotonic()
+    try:
+        assert app.generate_with_polly('hello', 'Joanna', timeout=0.05) is None
+    finally:
+        release.set()
+    assert time.monotonic() - started < 1
+    assert app.get_breaker('polly').stats()['window_failures'] == 0
@@ -0,0 +1,88 @@
+"""The offline fallback chain with a stubbed Coqui TTS class: no network and no model files."""
+import importlib.machinery
+import sys
+import time
+import types
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('numpy')
+app = pytest.importorskip('app')
+
+LANGUAGE, VOICE_ID = 'english', 'en-US-GuyNeural'  # coqui_fallback: en-ljspeech-glow-tts
+MODEL_NAME = 'tts_models/en/ljspeech/glow-tts'
+
+class FakeTTS:
+    is_multi_speaker = False
+    speakers = None
+    loaded = []
+
+    def __init__(self, model_name, progress_bar=False, gpu=False):
+        FakeTTS.loaded.append(model_name)
+        self.synthesizer = types.SimpleNamespace(tts_model=None, vocoder_model=None, output_sample_rate=22050)
+
+    def tts(self, text, speaker=None):
+        return [0.0] * 2205
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Edge and gTTS fail; Coqui is the stub above; saved audio is captured instead of written"""
+    package = types.ModuleType('TTS')
+    package.__spec__ = importlib.machinery.ModuleSpec('TTS', None)
+    api = types.ModuleType('TTS.api')
+    api.TTS = FakeTTS
+    monkeypatch.setitem(sys.modules, 'TTS', package)
+    monkeypatch.setitem(sys.modules, 'TTS.api', api)
+    FakeTTS.loaded = []
+
+    monkeypatch.setitem(app.app.config, 'COQUI_ENABLED', True)
+    monkeypatch.setattr(app, 'coqui_model_names', lambda: frozenset({MODEL_NAME}))
+    monkeypatch.setattr(app, 'coqui_model_downloaded', lambda model_name: True)
+    monkeypatch.setattr(app, 'coqui_models', app.CoquiModelCache(2**30, 3600))
+
+    calls = {'edge': 0, 'gtts': 0}
+
+    def failing(engine):
+        def generate(*args, **kwargs):
+            calls[engine] += 1
+            return None
+        return generate
+    monkeypatch.setattr(app, 'generate_with_edge', failing('edge'))
+    monkeypatch.setattr(app, 'generate_with_gtts', failing('gtts'))
+
+    saved = []
+
+    def save_audio_file(audio_data, extension):
+        saved.append((audio_data, extension))
+        return {'status': 'success', 'audio_url': f'/static/audio/test.{extension}',
+                'filepath': f'/tmp/test.{extension}'}
+    monkeypatch.setattr(app, 'save_audio_file', save_audio_file)
+    return calls, saved
+
+def test_loaded_model_serves_when_online_engines_fail(engines):
+    calls, saved = engines
+    app.coqui_models.get(MODEL_NAME)  # Prewarmed
+
+    result = app.perform_tts(f'coqui fallback {time.time()}', LANGUAGE, VOICE_ID)
+
+    assert result['voice_used'].endswith('(Coqui Fallback)')
+    assert result['format'] == 'wav'
+    assert saved[0][1] == 'wav' and saved[0][0][:4] == b'RIFF'
+    assert calls == {'edge': 1, 'gtts': 0}
+
+def test_unloaded_model_loads_in_background_instead_of_blocking(engines):
+    calls, saved = engines
+
+    with pytest.raises(Exception, match='All TTS methods failed'):
+        app.perform_tts(f'coqui cold {time.time()}', LANGUAGE, VOICE_ID)
+    assert calls['gtts'] == 1  # Coqui was skipped while its model loads
+
+    deadline = time.monotonic() + 5
+    while MODEL_NAME not in app.coqui_models.stats()['models']:
+        assert time.monotonic() < deadline, 'background load never finished'
+        time.sleep(0.01)
+
+    result = app.perform_tts(f'coqui warm {time.time()}', LANGUAGE, VOICE_ID)
+    assert result['voice_used'].endswith('(Coqui Fallback)')
+    assert FakeTTS.loaded == [MODEL_NAME]
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+VOICE = {'id': 'primary-voice', 'name': 'Primary', 'service': 'edge'}
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = app.HedgeController(percentile=0.9, default_delay=0.05, min_delay=0.01, min_samples=5)
+    monkeypatch.setattr(app, 'hedge_controller', controller)
+    return controller
+
+def use_engines(monkeypatch, primary, alternate):
+    monkeypatch.setattr(app, 'synthesize_with_service', lambda *args: primary())
+    monkeypatch.setattr(app, 'hedge_alternate', lambda *args: alternate and {
+        'name': 'Alternate', 'synthesize': lambda text: alternate()
+    })
+
+def test_fast_primary_is_not_hedged(monkeypatch, controller):
+    use_engines(monkeypatch, lambda: b'primary', lambda: b'alternate')
+
+    assert app.hedged_synthesize('english', VOICE, 'hello') == (b'primary', None)
+    stats = controller.stats()
+    assert stats['hedged'] == 0
+    assert stats['primary_wins'] == 1
+
+def test_slow_primary_loses_to_alternate(monkeypatch, controller):
+    release = threading.Event()
+    use_engines(monkeypatch, lambda: release.wait(5) and b'primary', lambda: b'alternate')
+
+    try:
+        assert app.hedged_synthesize('english', VOICE, 'hello') == (b'alternate', 'Alternate')
+    finally:
+        release.set()
+    stats = controller.stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+
+def test_primary_still_wins_when_alternate_fails(monkeypatch, controller):
+    release = threading.Event()
+
+    def alternate():
+        release.set()
+        return None
+
+    use_engines(monkeypatch, lambda: release.wait(5) and b'primary', alternate)
+
+    assert app.hedged_synthesize('english', VOICE, 'hello') == (b'primary', None)
+    stats = controller.stats()
+    assert stats['hedged'] == 1
+    assert stats['primary_wins'] == 1
+
+def test_no_alternate_waits_for_primary(monkeypatch, controller):
+    release = threading.Event()
+    threading.Timer(0.1, release.set).start()
+    use_engines(monkeypatch, lambda: release.wait(5) and b'primary', None)
+
+    assert app.hedged_synthesize('english', VOICE, 'hello') == (b'primary', None)
+    assert controller.stats()['hedged'] == 0
+
+def test_delay_follows_primary_latency_percentile():
+    controller = app.HedgeController(percentile=0.9, default_delay=1.0, min_delay=0.1, min_samples=5)
+    assert controller.delay('edge') == 1.0  # Too few samples
+
+    for seconds in (0.2, 0.3, 0.4, 0.5, 2.0):
+        controller.observe('edge', seconds)
+    assert controller.delay('edge') == 2.0
+
+    for _ in range(100):
+        controller.observe('edge', 0.01)
+    assert controller.delay('edge') == 0.1  # Never below min_delay
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+REQUEST = {'text': 'hello', 'language': 'english', 'voice_id': 'en-US-GuyNeural'}
+
+def wait_for_status(job_queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = job_queue.get(job_id)
+        if job and job['status'] == status:
+            return job
+        assert time.monotonic() < deadline, f"job never reached {status}: {job}"
+        time.sleep(0.01)
+
+def read_journal(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def wait_for_journal(path, job_id, status, timeout=5):
+    """The in-memory status changes just before its journal record is appended"""
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = [record['status'] for record in read_journal(path) if record['id'] == job_id and 'status' in record]
+        if statuses and statuses[-1] == status:
+            return statuses
+        assert time.monotonic() < deadline, f"journal never reached {status}: {statuses}"
+        time.sleep(0.01)
+
+@pytest.fixture
+def fake_tts(monkeypatch):
+    calls = []
+
+    def perform_tts(progress=None, **request):
+        calls.append(request)
+        progress(1, 2)
+        return {'audio_url': '/static/audio/test.mp3'}
+    monkeypatch.setattr(app, 'perform_tts', perform_tts)
+    return calls
+
+def test_submitted_job_runs_and_is_journaled(tmp_path, fake_tts):
+    journal = str(tmp_path / 'jobs.jsonl')
+    job_queue = app.JobQueue(journal, workers=1, max_queued=4, retention=3600)
+
+    job = job_queue.submit(REQUEST)
+    done = wait_for_status(job_queue, job['id'], 'completed')
+
+    assert done['result'] == {'audio_url': '/static/audio/test.mp3'}
+    assert fake_tts == [REQUEST]
+    assert wait_for_journal(journal, job['id'], 'completed')[0] == 'queued'
+
+def test_jobs_of_a_dead_owner_are_requeued(tmp_path, fake_tts):
+    journal = str(tmp_path / 'jobs.jsonl')
+    with open(journal, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'id': 'orphan', 'status': 'running', 'progress': 40, 'request': REQUEST,
+            'owner': 'dead-owner', 'created_at': time.time(), 'updated_at': time.time()
+        }) + '\n')
+
+    job_queue = app.JobQueue(journal, workers=1, max_queued=4, retention=3600)
+
+    wait_for_status(job_queue, 'orphan', 'completed')
+    assert fake_tts == [REQUEST]
+
+def test_jobs_of_a_live_owner_are_left_alone(tmp_path, monkeypatch):
+    journal = str(tmp_path / 'jobs.jsonl')
+    release = threading.Event()
+    calls = []
+
+    def perform_tts(progress=None, **request):
+        calls.append(request)
+        release.wait(5)
+        return {'audio_url': '/static/audio/test.mp3'}
+    monkeypatch.setattr(app, 'perform_tts', perform_tts)
+
+    leader = app.JobQueue(journal, workers=1, max_queued=4, retention=3600)
+    other = app.JobQueue(journal, workers=1, max_queued=4, retention=3600)
+    assert leader.stats()['leader'] and not other.stats()['leader']
+
+    job = other.submit(REQUEST)
+    wait_for_status(other, job['id'], 'running')
+    leader.maintain()
+
+    assert job['id'] not in leader.jobs
+    assert leader.get(job['id'])['owner'] == other.owner
+    release.set()
+    wait_for_status(other, job['id'], 'completed')
+    assert len(calls) == 1
+
+def test_maintenance_prunes_and_compacts_finished_jobs(tmp_path, fake_tts):
+    journal = str(tmp_path / 'jobs.jsonl')
+    job_queue = app.JobQueue(journal, workers=1, max_queued=4, retention=3600)
+    job = job_queue.submit(REQUEST)
+    wait_for_journal(journal, job['id'], 'completed')
+
+    # Compaction merges a job's records into one and drops its request once finished
+    job_queue.maintain()
+    records = read_journal(journal)
+    assert len(records) == 1
+    assert records[0]['status'] == 'completed' and 'request' not in records[0]
+
+    job_queue.retention = 0
+    job_queue.maintain()
+    assert job_queue.get(job['id']) is None
+    assert read_journal(journal) == []
+
+def test_bark_jobs_run_through_perform_bark(tmp_path, fake_tts, monkeypatch):
+    bark_calls = []
+
+    def perform_bark(progress=None, **request):
+        bark_calls.append(request)
+        return {'status': 'success', 'audio_url': '/static/audio/bark.wav'}
+    monkeypatch.setattr(app, 'perform_bark', perform_bark)
+
+    job_queue = app.JobQueue(str(tmp_path / 'jobs.jsonl'), workers=1, max_queued=4, retention=3600)
+    job = job_queue.submit({'engine': 'bark', 'text': 'long form', 'history_prompt': None, 'speaker_key': None})
+    done = wait_for_status(job_queue, job['id'], 'completed')
+
+    assert done['result']['audio_url'] == '/static/audio/bark.wav'
+    assert bark_calls == [{'text': 'long form', 'history_prompt': None, 'speaker_key': None}]
+    assert fake_tts == []
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+
+def run_followers(flight, key, count, fn, results, **kwargs):
+    def call():
+        try:
+            results.append(flight.do(key, fn, **kwargs))
+        except Exception as e:
+            results.append(e)
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def test_identical_calls_share_one_execution():
+    flight = app.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return b'audio'
+
+    results = []
+    threads = run_followers(flight, 'key', 5, fn, results)
+    wait_for(lambda: flight.stats()['leaders'] + flight.stats()['coalesced'] == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b'audio'] * 5
+    assert len(calls) == 1
+    assert flight.stats()['leaders'] == 1
+    assert flight.stats()['coalesced'] == 4
+    assert flight.stats()['in_flight'] == 0
+
+def test_leader_error_reaches_followers():
+    flight = app.SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError('engine failed')
+
+    results = []
+    threads = run_followers(flight, 'key', 3, fn, results)
+    wait_for(lambda: flight.stats()['coalesced'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 3 and all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()['errors'] == 1
+
+def test_follower_gives_up_after_its_timeout():
+    flight = app.SingleFlight()
+    release = threading.Event()
+    leader = run_followers(flight, 'key', 1, lambda: release.wait(5) and b'audio', [])
+    wait_for(lambda: flight.stats()['in_flight'] == 1)
+
+    with pytest.raises(TimeoutError):
+        flight.do('key', lambda: b'unused', timeout=0.05)
+    assert flight.stats()['timeouts'] == 1
+
+    release.set()
+    leader[0].join()
+
+def test_follower_retries_when_leader_ran_out_of_budget():
+    flight = app.SingleFlight()
+    release = threading.Event()
+
+    def leader_fn():
+        release.wait(5)
+        raise app.DeadlineExceeded('leader deadline')
+
+    leader_results = []
+    leader = run_followers(flight, 'key', 1, leader_fn, leader_results)
+    wait_for(lambda: flight.stats()['in_flight'] == 1)
+
+    follower_results = []
+    follower = run_followers(flight, 'key', 1, lambda: b'audio', follower_results,
+                             retry=lambda e: isinstance(e, app.DeadlineExceeded))
+    wait_for(lambda: flight.stats()['coalesced'] == 1)
+    release.set()
+    leader[0].join()
+    follower[0].join()
+
+    assert isinstance(leader_results[0], app.DeadlineExceeded)
+    assert follower_results == [b'audio']
+    assert flight.stats()['retries'] == 1
+
+def test_new_keys_bypass_a_full_table():
+    flight = app.SingleFlight(max_keys=1)
+    release = threading.Event()
+    leader = run_followers(flight, 'a', 1, lambda: release.wait(5) and b'a', [])
+    wait_for(lambda: flight.stats()['in_flight'] == 1)
+
+    assert flight.do('b', lambda: b'b') == b'b'
+    assert flight.stats()['bypassed'] == 1
+
+    release.set()
+    leader[0].join()
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip('flask')
+app = pytest.importorskip('app')
+
+def test_lookup_counts_one_miss_for_several_keys():
+    cache = app.SynthesisCache(8)
+
+    assert cache.lookup('variant', 'native') == (None, None)
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 0
+
+def test_lookup_falls_back_to_the_next_key(tmp_path):
+    native = tmp_path / 'native.mp3'
+    native.write_bytes(b'audio')
+    cache = app.SynthesisCache(8)
+    cache.put('native', {'audio_url': '/static/audio/native.mp3', 'filepath': str(native)})
+
+    key, entry = cache.lookup('variant', 'native')
+
+    assert key == 'native' and entry['filepath'] == str(native)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 0
+
+def test_entry_whose_file_vanished_is_a_miss(tmp_path):
+    cache = app.SynthesisCache(8)
+    cache.put('key', {'audio_url': '/static/audio/gone.mp3', 'filepath': str(tmp_path / 'gone.mp3')})
+
+    assert cache.get('key') is None
+    assert cache.stats() == dict(cache.stats(), entries=0, misses=1)